@@ -0,0 +1,186 @@
+"""
+Time detect, checker and validator over the installed standard library
+and over synthetic large modules, splitting parse time from walk time
+and recording nodes per second and peak memory.
+
+    $ python bench/bench_corpus.py -o results.json
+    $ python bench/bench_corpus.py --compare results.json
+
+Results are written as JSON so runs from different commits can be
+compared with ``--compare``.
+"""
+
+import ast
+import sys
+import json
+import time
+import argparse
+import platform
+import warnings
+import subprocess
+import tracemalloc
+import importlib.util
+
+sys.path.insert(0, '.')
+warnings.simplefilter('ignore')
+
+import subpy
+from subpy.features import *
+from subpy.stdlib import standard_library
+from subpy.validate import Detect, Checker, Validator, FullPython
+
+subset = FullPython - set([Classes, Exceptions, Generators, Lambda])
+
+#------------------------------------------------------------------------
+# Corpora
+#------------------------------------------------------------------------
+
+def stdlib():
+    sources = []
+    for name in sorted(set(standard_library())):
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+            continue
+        with open(spec.origin, encoding='utf-8') as fd:
+            sources.append((name, fd.read()))
+    return sources
+
+template = '''
+def function_%(i)d(xs, n=10):
+    total = 0
+    for i in range(n):
+        if xs[i] > 0 and i %% 2:
+            total += xs[i] * 2.0
+        else:
+            total -= 1
+    ys = [x + 1 for x in xs if x]
+    return total, ys
+
+class Class_%(i)d(object):
+    def method(self, a, b):
+        return a if a > b else b
+'''
+
+def synthetic(functions):
+    source = ''.join(template % {'i': i} for i in range(functions))
+    return [('synthetic-%d' % functions, source)]
+
+#------------------------------------------------------------------------
+# Timing
+#------------------------------------------------------------------------
+
+def visitors():
+    return [
+        ('detect', Detect()),
+        ('checker', Checker(subset, [])),
+        ('validator', Validator(subset, [], collect=True)),
+    ]
+
+def checkable(sources):
+    ok = []
+    for name, source in sources:
+        try:
+            Detect()(source)
+        except BaseException:
+            continue
+        ok.append((name, source))
+    return ok
+
+def measure(corpus, sources, repeat):
+    trees = []
+    parse = 0.0
+    for name, source in sources:
+        start = time.perf_counter()
+        trees.append(ast.parse(source))
+        parse += time.perf_counter() - start
+
+    nodes = sum(sum(1 for _ in ast.walk(tree)) for tree in trees)
+
+    results = []
+    for tool, d in visitors():
+        walk = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for tree in trees:
+                d(tree)
+            walk = min(walk, time.perf_counter() - start)
+
+        tracemalloc.start()
+        for name, source in sources:
+            d(source)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append({
+            'corpus'      : corpus,
+            'tool'        : tool,
+            'files'       : len(sources),
+            'nodes'       : nodes,
+            'parse_s'     : parse,
+            'walk_s'      : walk,
+            'nodes_per_s' : nodes / walk,
+            'peak_bytes'  : peak,
+        })
+    return results
+
+#------------------------------------------------------------------------
+# Reporting
+#------------------------------------------------------------------------
+
+def commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def show(results, baseline=None):
+    before = {}
+    if baseline:
+        before = dict(((r['corpus'], r['tool']), r) for r in baseline['results'])
+
+    print('%-18s %-10s %8s %10s %10s %12s %10s %8s' % ('corpus', 'tool', 'files',
+        'parse', 'walk', 'nodes/s', 'peak', 'vs base'))
+    for r in results:
+        old = before.get((r['corpus'], r['tool']))
+        ratio = '%7.2fx' % (old['walk_s'] / r['walk_s']) if old else ''
+        print('%-18s %-10s %8d %8.1fms %8.1fms %12.0f %8.1fMB %8s' % (r['corpus'],
+            r['tool'], r['files'], r['parse_s']*1e3, r['walk_s']*1e3,
+            r['nodes_per_s'], r['peak_bytes'] / 2.0**20, ratio))
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('-o', '--output', help='write results as JSON to this file')
+    p.add_argument('--compare', help='JSON results of a previous run to compare with')
+    p.add_argument('--repeat', type=int, default=5)
+    args = p.parse_args(argv)
+
+    sources = stdlib()
+    checked = checkable(sources)
+    if len(checked) < len(sources):
+        print('skipping %d of %d stdlib modules subpy cannot check' % (
+            len(sources) - len(checked), len(sources)))
+
+    results = measure('stdlib', checked, args.repeat)
+    for functions in (200, 2000):
+        results.extend(measure('synthetic-%d' % functions, synthetic(functions), args.repeat))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fd:
+            baseline = json.load(fd)
+    show(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump({
+                'commit'  : commit(),
+                'subpy'   : subpy.__version__,
+                'python'  : platform.python_version(),
+                'machine' : platform.machine(),
+                'time'    : time.time(),
+                'results' : results,
+            }, fd, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare the compiled dispatch table against evaluating every check on
+every node and testing membership in the feature set, over the
+standard library modules listed in ``subpy/stdlib.py``. Sources are
+parsed once up front so only the tree walk is timed.
+
+    $ python bench/bench_dispatch.py
+"""
+
+import ast
+import sys
+import time
+import inspect
+import warnings
+import importlib
+
+sys.path.insert(0, '.')
+warnings.simplefilter('ignore')
+
+from subpy.features import *
+from subpy.stdlib import libraries
+from collections import defaultdict
+
+from subpy.validate import Checker, FullPython, compile_dispatch
+
+class Unmasked(Checker):
+    """ Run every check on every node and filter on the feature set at
+    each site, as the visitor did before the dispatch table. """
+
+    def __init__(self, features, libraries):
+        super(Unmasked, self).__init__(features, libraries)
+        self._dispatch = compile_dispatch(0, bool(self.libs))
+
+    def action(self, node, feature):
+        if feature not in self.features:
+            self.detected[feature].append(node.lineno)
+
+subsets = [
+    ('numeric', FullPython - set([Classes, Exceptions, Generators, Lambda])),
+    ('full-minus-one', FullPython - set([Exec])),
+    ('full', FullPython),
+]
+
+def corpus():
+    sources = []
+    for lib in libraries:
+        try:
+            mod = importlib.import_module(lib)
+            source = inspect.getsource(mod)
+            Checker(set(), [])(source)
+        except BaseException:
+            continue
+        sources.append((lib, source))
+    return sources
+
+def timeit(cls, features, trees, repeat):
+    d = cls(features, [])
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for tree in trees:
+            d.detected = defaultdict(list)
+            d.visit(tree)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(repeat=20):
+    sources = corpus()
+    trees = [ast.parse(source) for lib, source in sources]
+    print('%d modules from subpy.stdlib.libraries' % len(sources))
+    print('%-16s %12s %12s %8s' % ('subset', 'unmasked', 'compiled', 'speedup'))
+
+    for name, features in subsets:
+        for lib, source in sources:
+            assert Unmasked(features, [])(source) == Checker(features, [])(source), lib
+
+        before = timeit(Unmasked, features, trees, repeat)
+        after = timeit(Checker, features, trees, repeat)
+        print('%-16s %11.1fms %11.1fms %7.2fx' % (name, before*1e3, after*1e3, before/after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare the library matcher against the regex alternation it replaced
+for allow-lists with thousands of entries, both for building the
+matcher and for testing import names against it.
+
+    $ python bench/bench_matcher.py
+"""
+
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, '.')
+
+from subpy.validate import LibraryMatcher, compile_libraries
+
+def alternation(libs):
+    """ The allow-list as a single pattern, as the visitor used to
+    build it for every instance. """
+    matches = []
+    for allowed in libs:
+        matches.append(allowed.replace('.', '\\.')\
+                              .replace('*', '.*$'))
+    return r'|'.join(matches)
+
+def allowlist(size, rand):
+    libs = []
+    for i in range(size):
+        pkg = 'pkg%d' % i
+        if i % 3 == 0:
+            libs.append(pkg + '.*')
+        else:
+            libs.append('%s.mod%d' % (pkg, rand.randrange(10)))
+    return libs
+
+def imports(size, count, rand):
+    names = []
+    for _ in range(count):
+        names.append('pkg%d.mod%d.name' % (rand.randrange(size*2), rand.randrange(10)))
+    return names
+
+def compile_uncached(pattern):
+    # re.match caches compiled patterns, so clear it to time a build
+    re.purge()
+    return re.compile(pattern)
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(repeat=5, count=10000):
+    rand = random.Random(0)
+    print('%8s %14s %14s %14s %14s' % ('entries', 'regex build', 'trie build',
+                                       'regex match', 'trie match'))
+
+    for size in (10, 100, 1000, 5000):
+        libs = allowlist(size, rand)
+        names = imports(size, count, rand)
+        pattern = alternation(libs)
+        matcher = compile_libraries(libs)
+
+        regex_build = best(lambda: compile_uncached(pattern), repeat)
+        trie_build = best(lambda: LibraryMatcher(libs), repeat)
+        regex_match = best(lambda: [re.match(pattern, n) for n in names], repeat)
+        trie_match = best(lambda: [matcher(n) for n in names], repeat)
+
+        print('%8d %12.2fms %12.2fms %12.2fms %12.2fms' % (size,
+            regex_build*1e3, trie_build*1e3, regex_match*1e3, trie_match*1e3))
+
+if __name__ == '__main__':
+    main()
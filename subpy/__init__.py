@@ -1,6 +1,17 @@
+__version__ = '0.1'
+
 from .features import *
-from .validate import detect, fd, checker, validator, \
-    FeatureNotSupported, FullPython
+from .validate import detect, fd, checker, validator, violations, \
+    conforms, check_many, check_profiles, scan_paths, \
+    Checker, Validator, Detect, FeatureNotSupported, FeaturesNotSupported, \
+    LibraryNotSupported, LimitExceeded, Limits, FullPython, LineIndex, \
+    register_feature, unregister_feature, rule
+from .cache import ResultCache
+from .incremental import IncrementalChecker
+from .results import Results
+from .index import FeatureIndex
+from .graph import check_imports, ImportGraph
+from .decorators import subset
 
 
 from .tests.test_features import run
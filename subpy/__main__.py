@@ -0,0 +1,82 @@
+"""
+Check Python files against a subset of the language, printing one JSON
+line per file as soon as it's checked.
+
+    $ python -m subpy src/ --exclude ListComp,SetComp --jobs 8
+
+Exits with 0 if every file conforms, 1 if any file uses a feature or
+library outside the subset and 2 if any file couldn't be checked.
+"""
+
+import sys
+import json
+import argparse
+
+from .features import FeatureNames
+from .validate import scan_paths, FullPython
+
+codes = dict((name, code) for code, name in FeatureNames.items())
+
+def feature_set(spec):
+    try:
+        return set(codes[name.strip()] for name in spec.split(',') if name.strip())
+    except KeyError as e:
+        raise argparse.ArgumentTypeError('unknown feature %s' % e)
+
+def library_list(spec):
+    return [name.strip() for name in spec.split(',') if name.strip()]
+
+def parser():
+    p = argparse.ArgumentParser(prog='python -m subpy',
+        description='Check Python files against a subset of the language.')
+    p.add_argument('paths', nargs='+',
+        help='files or directories to check')
+
+    subset = p.add_mutually_exclusive_group()
+    subset.add_argument('-f', '--features', type=feature_set, default=None,
+        help='comma separated features to allow (default: none)')
+    subset.add_argument('-x', '--exclude', type=feature_set, default=None,
+        help='comma separated features to disallow from full Python')
+
+    p.add_argument('-l', '--libraries', type=library_list, default=None,
+        help='comma separated allow-list of importable modules')
+    p.add_argument('-j', '--jobs', type=int, default=1,
+        help='number of worker processes (0 for one per core)')
+    return p
+
+def report(path, result, libraries):
+    if isinstance(result, Exception):
+        return {'path': path, 'error': '%s: %s' % (type(result).__name__, result)}, 2
+
+    nolibs = result.pop(None, [])
+    found = dict((FeatureNames.get(k, str(k)), v) for k, v in sorted(result.items()))
+    line = {'path': path, 'features': found}
+
+    if libraries:
+        line['libraries'] = {}
+        for library, lineno in nolibs:
+            line['libraries'].setdefault(library, []).append(lineno)
+    return line, 1 if found or nolibs else 0
+
+def main(argv=None, out=sys.stdout):
+    args = parser().parse_args(argv)
+
+    if args.exclude is not None:
+        features = FullPython - args.exclude
+    else:
+        features = args.features or set()
+
+    status = 0
+    results = scan_paths(args.paths, features, args.libraries,
+                         workers=args.jobs or None, errors='return',
+                         collect=True)
+
+    for path, result in results:
+        line, code = report(path, result, args.libraries)
+        out.write(json.dumps(line) + '\n')
+        out.flush()
+        status = max(status, code)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import os
+import ast
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .validate import Checker, Validator, Detect, Limits, \
+    FeaturesNotSupported, getsource, export_rules, import_rules, _errors
+
+#------------------------------------------------------------------------
+# Worker
+#------------------------------------------------------------------------
+
+def check(kind, rules, source, features, libraries, limits, collect=False,
+          max_errors=None):
+    """ Run one check in a worker process with the caller's custom
+    rules. A validator's verdict is returned as the class name and
+    arguments of each violation, to be raised in the caller's
+    process. """
+    import_rules(rules)
+    if kind == 'detect':
+        return Detect(limits)(source)
+    if kind == 'checker':
+        return Checker(features, libraries, limits)(source)
+
+    v = Validator(features, libraries, collect=True,
+                  max_errors=max_errors if collect else 1, limits=limits)
+    return tuple((type(e).__name__, e.args) for e in v(source))
+
+#------------------------------------------------------------------------
+# Slots
+#------------------------------------------------------------------------
+
+class Slots(object):
+    """ Semaphore shared by every event loop that uses a checker and
+    released from the pool's threads. A slot released after the loop
+    that took it has closed still goes back to the pool, where an
+    ``asyncio.Semaphore`` would have lost it. """
+
+    def __init__(self, count):
+        self.lock = threading.Lock()
+        self.free = count
+        self.waiters = deque()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.free:
+                self.free -= 1
+                return
+            waiter = loop.create_future()
+            self.waiters.append((loop, waiter))
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self.lock:
+                queued = (loop, waiter) in self.waiters
+                if queued:
+                    self.waiters.remove((loop, waiter))
+            # Handed a slot just as the caller was cancelled
+            if not queued and waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        # The slot goes to the first caller still waiting on a loop
+        # that's open, or back to the pool
+        with self.lock:
+            while self.waiters:
+                loop, waiter = self.waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self.wake, waiter)
+                    return
+                except RuntimeError:
+                    # The waiter's loop has been closed
+                    continue
+            self.free += 1
+
+    def wake(self, waiter):
+        if waiter.done():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+#------------------------------------------------------------------------
+# Async Checking
+#------------------------------------------------------------------------
+
+class AsyncChecker(object):
+    """ Runs checks for an asyncio application on a bounded pool of
+    processes, so parsing and walking large sources never blocks the
+    event loop, even for the time the parser holds the GIL.
+
+    At most ``max_pending`` checks are queued or running at once;
+    further callers wait for a slot rather than growing the queue. A
+    check that times out or whose task is cancelled returns control to
+    its caller at once. Its slot is only given back once the worker is
+    free, and the worker gives up on the walk when the timeout passes.
+    Parsing can't be interrupted, so ``Limits.max_bytes`` should bound
+    the size of sources that aren't trusted.
+
+    The custom rules registered when a check is made are sent with it,
+    so workers started before a rule was registered still apply it. """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or 4 * self.workers
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.slots = Slots(self.max_pending)
+        self.pending = set()
+
+    async def run(self, fn, *args, timeout=None):
+        """ Call ``fn(*args)`` in the pool, raising
+        ``asyncio.TimeoutError`` if it takes longer than ``timeout``
+        seconds. """
+        await self.slots.acquire()
+        try:
+            future = self.pool.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+
+        # The slot is held until the worker finishes, not just until
+        # the caller stops waiting
+        def done(future):
+            self.pending.discard(future)
+            self.slots.release()
+        self.pending.add(future)
+        future.add_done_callback(done)
+
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def limits(self, limits, timeout):
+        # Without limits of its own a check is given the timeout, so its
+        # worker stops walking once the caller has stopped waiting
+        if limits is None and timeout is not None:
+            return Limits(timeout=timeout)
+        return limits
+
+    def prepare(self, source):
+        # Modules and functions can't be sent to a worker, their source
+        # can
+        if isinstance(source, (str, ast.AST)):
+            return source
+        return getsource(source)
+
+    async def checker(self, source, features=None, libraries=None,
+                      timeout=None, limits=None):
+        features = features or set()
+        libraries = libraries or list()
+        return await self.run(check, 'checker', export_rules(),
+                              self.prepare(source), features, libraries,
+                              self.limits(limits, timeout), timeout=timeout)
+
+    async def validator(self, source, features=None, libraries=None,
+                        timeout=None, collect=False, max_errors=None,
+                        limits=None):
+        features = features or set()
+        libraries = libraries or list()
+        verdict = await self.run(check, 'validator', export_rules(),
+                                 self.prepare(source), features, libraries,
+                                 self.limits(limits, timeout), collect,
+                                 max_errors, timeout=timeout)
+
+        errors = [_errors[name](*args) for name, args in verdict]
+        if errors and collect:
+            raise FeaturesNotSupported(errors)
+        if errors:
+            raise errors[0]
+
+    async def detect(self, source, timeout=None, limits=None):
+        return await self.run(check, 'detect', export_rules(),
+                              self.prepare(source), None, None,
+                              self.limits(limits, timeout), timeout=timeout)
+
+    def close(self, wait=True):
+        for future in list(self.pending):
+            future.cancel()
+        self.pool.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close(wait=False)
+
+_default = None
+
+def default():
+    global _default
+    if _default is None:
+        _default = AsyncChecker()
+    return _default
+
+async def checker(source, features=None, libraries=None, timeout=None,
+                  limits=None):
+    return await default().checker(source, features, libraries, timeout,
+                                   limits)
+
+async def validator(source, features=None, libraries=None, timeout=None,
+                    collect=False, max_errors=None, limits=None):
+    return await default().validator(source, features, libraries, timeout,
+                                     collect, max_errors, limits)
+
+async def detect(source, timeout=None, limits=None):
+    return await default().detect(source, timeout, limits)
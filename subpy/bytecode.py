@@ -0,0 +1,396 @@
+import dis
+import types
+import marshal
+import importlib.util
+from collections import defaultdict
+
+from .features import *
+from .validate import compile_libraries, LibraryNotSupported
+
+#------------------------------------------------------------------------
+# Bytecode Detection
+#------------------------------------------------------------------------
+
+# Features that leave a trace in compiled code. The rest (decorators,
+# chained comparisons, ternaries, continue and so on) compile to plain
+# calls and jumps and can't be told apart once compiled. Constant
+# folding also hides implicit casts between literals.
+detectable = set([
+    Generators,
+    DelVar,
+    Closures,
+    Classes,
+    VarArgs,
+    KeywordArgs,
+    Inheritance,
+    MInheritance,
+    Assertions,
+    Exceptions,
+    Lambda,
+    RelativeImports,
+    ImportStar,
+    HeteroList,
+    MultipleReturn,
+    DictComp,
+    TupleUnpacking,
+    Exec,
+    Globals,
+    ContextManagers,
+    GeneratorExp,
+    ListComp,
+    SetComp,
+    Printing,
+    Metaclasses,
+    AsyncAwait,
+    FStrings,
+    PatternMatching,
+])
+
+CO_NEWLOCALS = 0x0002
+CO_VARARGS = 0x0004
+CO_VARKEYWORDS = 0x0008
+CO_GENERATOR = 0x0020
+CO_COROUTINE = 0x0080
+CO_ITERABLE_COROUTINE = 0x0100
+CO_ASYNC_GENERATOR = 0x0200
+
+# Opcode name -> feature, for opcodes that only come from one feature
+opcodes = {
+    'DELETE_FAST'           : DelVar,
+    'DELETE_NAME'           : DelVar,
+    'DELETE_GLOBAL'         : DelVar,
+    'DELETE_DEREF'          : DelVar,
+    'DELETE_SUBSCR'         : DelVar,
+    'DELETE_ATTR'           : DelVar,
+    'LOAD_BUILD_CLASS'      : Classes,
+    'LOAD_ASSERTION_ERROR'  : Assertions,
+    'SETUP_EXCEPT'          : Exceptions,
+    'SETUP_FINALLY'         : Exceptions,
+    'CHECK_EXC_MATCH'       : Exceptions,
+    'CHECK_EG_MATCH'        : Exceptions,
+    'JUMP_IF_NOT_EXC_MATCH' : Exceptions,
+    'IMPORT_STAR'           : ImportStar,
+    'UNPACK_SEQUENCE'       : TupleUnpacking,
+    'UNPACK_EX'             : TupleUnpacking,
+    'STORE_GLOBAL'          : Globals,
+    'SETUP_WITH'            : ContextManagers,
+    'BEFORE_WITH'           : ContextManagers,
+    'SETUP_ASYNC_WITH'      : AsyncAwait,
+    'BEFORE_ASYNC_WITH'     : AsyncAwait,
+    'GET_AWAITABLE'         : AsyncAwait,
+    'GET_AITER'             : AsyncAwait,
+    'FORMAT_VALUE'          : FStrings,
+    'FORMAT_SIMPLE'         : FStrings,
+    'FORMAT_WITH_SPEC'      : FStrings,
+    'MATCH_CLASS'           : PatternMatching,
+    'MATCH_MAPPING'         : PatternMatching,
+    'MATCH_SEQUENCE'        : PatternMatching,
+    'MATCH_KEYS'            : PatternMatching,
+}
+
+# Appends into a comprehension's result, which sits beneath its iterator
+# so the operand is at least 2. Displays like [*xs, y] append with 1.
+appends = {
+    'LIST_APPEND' : ListComp,
+    'SET_ADD'     : SetComp,
+    'MAP_ADD'     : DictComp,
+}
+
+calls = set(['CALL_FUNCTION', 'CALL_FUNCTION_KW', 'CALL_FUNCTION_EX',
+             'CALL_METHOD', 'PRECALL', 'CALL', 'CALL_KW'])
+
+# Code object name -> feature, for code that is always compiled apart
+names = {
+    '<lambda>'   : Lambda,
+    '<genexpr>'  : GeneratorExp,
+    '<listcomp>' : ListComp,
+    '<setcomp>'  : SetComp,
+    '<dictcomp>' : DictComp,
+}
+
+def instructions(code):
+    """ Instructions of a code object with the line each comes from. """
+    line = code.co_firstlineno
+    for inst in dis.get_instructions(code):
+        positions = getattr(inst, 'positions', None)
+        if positions is not None:
+            line = positions.lineno or line
+        elif inst.starts_line is not None:
+            line = inst.starts_line
+        yield inst, line
+
+def is_function(code):
+    return (code.co_flags & CO_NEWLOCALS and not code.co_name.startswith('<'))
+
+def class_bases(code, insts, i):
+    # From the LOAD_BUILD_CLASS at insts[i], count the bases and keyword
+    # names passed to __build_class__ after the class body function and
+    # the class name, tracking the stack depth to find the call itself
+    # past any calls nested in the bases. Returns None when the pattern
+    # isn't recognized.
+    n = len(insts)
+    while i < n and not isinstance(insts[i][0].argval, types.CodeType):
+        i += 1
+    i += 1
+    while i < n and insts[i][0].opname in ('MAKE_FUNCTION', 'SET_FUNCTION_ATTRIBUTE'):
+        i += 1
+    if i >= n or insts[i][0].opname != 'LOAD_CONST':
+        return None
+
+    depth = 0
+    kwnames = ()
+    last = None
+    for inst, line in insts[i + 1:i + 256]:
+        op = inst.opname
+        if op == 'KW_NAMES':
+            kwnames = code.co_consts[inst.arg]
+            continue
+        if op == 'CALL_FUNCTION_EX':
+            return None, ()
+        if op in calls:
+            onstack = op in ('CALL_FUNCTION_KW', 'CALL_KW')
+            if inst.arg == depth + 2 - onstack:
+                if onstack:
+                    kwnames = last
+                return depth - len(kwnames) - onstack, kwnames
+        if inst.opcode < dis.HAVE_ARGUMENT:
+            depth += dis.stack_effect(inst.opcode)
+        else:
+            depth += dis.stack_effect(inst.opcode, inst.arg or 0, jump=False)
+        last = inst.argval
+    return None
+
+def implicit_del(insts, i):
+    # The ``e = None; del e`` compiled after every ``except E as e``
+    if i < 2:
+        return False
+    load, store = insts[i-2][0], insts[i-1][0]
+    return load.opname == 'LOAD_CONST' and load.argval is None and \
+        store.opname.startswith('STORE_') and store.argval == insts[i][0].argval
+
+def code_features(code, outer=None):
+    """ Yield ``(feature, line)`` for every feature found in the code
+    object and the code objects nested in it. """
+    flags = code.co_flags
+    first = code.co_firstlineno
+
+    ## Check for generators and coroutines
+    if flags & (CO_COROUTINE | CO_ITERABLE_COROUTINE | CO_ASYNC_GENERATOR):
+        yield AsyncAwait, first
+    if flags & CO_ASYNC_GENERATOR:
+        yield Generators, first
+
+    # Plain generators are reported at each yield, as only they yield
+    generator = flags & CO_GENERATOR and code.co_name != '<genexpr>'
+
+    ## Check for variadic and keyword arguments
+    if flags & CO_VARARGS:
+        yield VarArgs, first
+    if flags & CO_VARKEYWORDS:
+        yield KeywordArgs, first
+
+    ## Check for lambdas and comprehensions compiled apart
+    if code.co_name in names:
+        yield names[code.co_name], first
+
+    ## Check for closures
+    if outer is not None and is_function(outer) and is_function(code):
+        yield Closures, first
+
+    insts = list(instructions(code))
+    consts = []
+    handler = False
+    assertion = False
+
+    for i, (inst, line) in enumerate(insts):
+        op = inst.opname
+
+        if handler:
+            # An exception handler, unless it is the exit of a with
+            handler = False
+            if op != 'WITH_EXCEPT_START':
+                yield Exceptions, line
+
+        if op in opcodes:
+            # Module level stores are global without a global statement
+            if op == 'STORE_GLOBAL' and not is_function(code):
+                pass
+            # Nor is the name bound by an except clause deleted by a del
+            elif op.startswith('DELETE_') and implicit_del(insts, i):
+                pass
+            else:
+                yield opcodes[op], line
+            if op == 'LOAD_ASSERTION_ERROR':
+                assertion = True
+            if op in ('SETUP_ASYNC_WITH', 'BEFORE_ASYNC_WITH'):
+                yield ContextManagers, line
+
+        elif op == 'PUSH_EXC_INFO':
+            handler = True
+
+        elif op in ('YIELD_VALUE', 'YIELD_FROM'):
+            if generator:
+                yield Generators, line
+
+        elif op == 'RAISE_VARARGS':
+            ## Check for exceptions raised other than by assert
+            if not assertion:
+                yield Exceptions, line
+            assertion = False
+
+        elif op in appends:
+            ## Check for comprehensions inlined into their scope
+            if inst.arg >= 2:
+                yield appends[op], line
+
+        elif op in ('LOAD_GLOBAL', 'LOAD_NAME'):
+            ## Check for printing and dynamic exec
+            if inst.argval == 'print':
+                yield Printing, line
+            elif inst.argval == 'exec':
+                yield Exec, line
+
+        elif op == 'STORE_NAME' and inst.argval == '__metaclass__':
+            yield Metaclasses, line
+
+        elif op == 'CALL_INTRINSIC_1' and inst.argrepr == 'INTRINSIC_IMPORT_STAR':
+            yield ImportStar, line
+
+        elif op == 'LIST_EXTEND' and consts and type(consts[-1]) is tuple:
+            ## Check for hetereogenous lists built from a constant tuple
+            if len(set(type(x) for x in consts[-1])) > 1:
+                yield HeteroList, line
+
+        elif op == 'IMPORT_NAME' and len(consts) >= 2:
+            ## Check for relative imports
+            if consts[-2]:
+                yield RelativeImports, line
+
+        elif op == 'RETURN_VALUE':
+            ## Check for multiple returns
+            prev = insts[i-1][0]
+            if prev.opname == 'BUILD_TUPLE' or \
+               prev.opname == 'LOAD_CONST' and type(prev.argval) is tuple:
+                yield MultipleReturn, line
+
+        elif op == 'RETURN_CONST' and type(inst.argval) is tuple:
+            yield MultipleReturn, line
+
+        if op == 'LOAD_BUILD_CLASS':
+            ## Check for inheritance and metaclasses
+            found = class_bases(code, insts, i)
+            if found:
+                bases, kwnames = found
+                if bases is None or bases >= 1:
+                    yield Inheritance, line
+                if bases is not None and bases > 1:
+                    yield MInheritance, line
+                if 'metaclass' in kwnames:
+                    yield Metaclasses, line
+
+        if op == 'LOAD_CONST':
+            consts.append(inst.argval)
+        else:
+            del consts[:]
+
+        if op in ('CALL_FUNCTION_KW', 'KW_NAMES', 'CALL_KW'):
+            yield KeywordArgs, line
+        elif op == 'CALL_FUNCTION_EX':
+            yield VarArgs, line
+            if inst.arg & 1:
+                yield KeywordArgs, line
+        elif op in ('MAKE_FUNCTION', 'SET_FUNCTION_ATTRIBUTE'):
+            ## Check for default arguments
+            if inst.arg & 0x03:
+                yield KeywordArgs, line
+
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            for found in code_features(const, code):
+                yield found
+
+#------------------------------------------------------------------------
+# Toplevel
+#------------------------------------------------------------------------
+
+def load_pyc(path):
+    """ The module code object marshalled in a ``.pyc`` file, which has
+    to come from the running interpreter. """
+    with open(path, 'rb') as fd:
+        data = fd.read()
+    if data[:4] != importlib.util.MAGIC_NUMBER:
+        raise ValueError('%s was not compiled by this Python' % path)
+    return marshal.loads(data[16:])
+
+def getcode(obj):
+    if isinstance(obj, types.CodeType):
+        return obj
+    if isinstance(obj, str) and obj.endswith('.pyc'):
+        return load_pyc(obj)
+    if isinstance(obj, types.MethodType):
+        obj = obj.__func__
+    code = getattr(obj, '__code__', None)
+    if isinstance(code, types.CodeType):
+        return code
+    raise TypeError('No code object for %r' % (obj,))
+
+def sites(obj):
+    # Lines are counted from the first line of the outermost code
+    # object, as when checking the object's source on its own.
+    code = getcode(obj)
+    offset = code.co_firstlineno - 1
+    detected = defaultdict(set)
+    for feature, line in code_features(code):
+        detected[feature].add(line - offset)
+
+    ## Check for defaults on a function object
+    if getattr(obj, '__defaults__', None) or getattr(obj, '__kwdefaults__', None):
+        detected[KeywordArgs].add(1)
+    return code, detected
+
+def detect(obj):
+    """ Detect the features used by a function, method or code object,
+    or the module in a ``.pyc`` file, without its source. Only the
+    ``detectable`` features can be found this way. """
+    code, detected = sites(obj)
+    return dict((f, sorted(lines)) for f, lines in detected.items())
+
+def checker(obj, features=None, libraries=None):
+    """ Sites of the features outside the feature set, as ``checker``
+    returns them, with imports of libraries outside ``libraries``
+    raising ``LibraryNotSupported``. """
+    features = features or set()
+    code, detected = sites(obj)
+
+    if libraries:
+        matcher = compile_libraries(libraries)
+        for name in imports(code):
+            if not matcher(name):
+                raise LibraryNotSupported(name)
+
+    return dict((f, sorted(lines)) for f, lines in detected.items()
+                if f not in features)
+
+def imports(code):
+    """ The absolute imports made by the code object and the code
+    objects nested in it, named as the AST checker names them. """
+    consts = []
+    for inst in dis.get_instructions(code):
+        if inst.opname == 'IMPORT_NAME' and len(consts) >= 2:
+            level, fromlist = consts[-2], consts[-1]
+            if not level:
+                if fromlist:
+                    for name in fromlist:
+                        yield inst.argval + '.' + name
+                else:
+                    yield inst.argval
+
+        if inst.opname == 'LOAD_CONST':
+            consts.append(inst.argval)
+        else:
+            del consts[:]
+
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            for name in imports(const):
+                yield name
@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import marshal
+import sqlite3
+import hashlib
+
+from . import __version__
+from .validate import rules_key
+
+#------------------------------------------------------------------------
+# Result Cache
+#------------------------------------------------------------------------
+
+default_path = os.path.join(os.path.expanduser('~'), '.cache', 'subpy',
+                            'results.db')
+
+class ResultCache(object):
+    """ Persistent store of checker, detect and validator results keyed
+    by the source text and the configuration it was checked against.
+    The least recently used entries are evicted once the store grows
+    past ``max_entries``. Access times of hits are written once
+    ``batch`` entries have been hit, before evicting and on ``close``,
+    so reads from a warm cache don't each cost a write. """
+
+    def __init__(self, path=default_path, max_entries=100000, batch=1000):
+        directory = os.path.dirname(path)
+        if path != ':memory:' and directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.batch = batch
+        # Key -> access time of hits not yet written
+        self.touched = {}
+
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS results '
+                        '(key TEXT PRIMARY KEY, value BLOB, atime REAL)')
+        self.db.commit()
+        self.size = self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def key(self, kind, source, features, libraries):
+        h = hashlib.blake2b(digest_size=20)
+        h.update(source.encode('utf-8', 'surrogatepass'))
+        h.update(repr((
+            kind,
+            sorted(features),
+            list(libraries),
+            rules_key(),
+            __version__,
+            sys.version_info[:2],
+        )).encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        row = self.db.execute('SELECT value FROM results WHERE key = ?',
+                              (key,)).fetchone()
+        if row is None:
+            return None
+
+        # Access times are only needed to evict, so hits are written
+        # in batches rather than each costing a write
+        self.touched[key] = time.time()
+        if len(self.touched) >= self.batch:
+            self.flush()
+            self.db.commit()
+        return marshal.loads(row[0])
+
+    def put(self, key, value):
+        row = (marshal.dumps(value), time.time(), key)
+        cur = self.db.execute('UPDATE results SET value = ?, atime = ? '
+                              'WHERE key = ?', row)
+        if cur.rowcount == 0:
+            self.db.execute('INSERT INTO results (value, atime, key) '
+                            'VALUES (?, ?, ?)', row)
+            self.size += 1
+        self.touched.pop(key, None)
+
+        if self.size > self.max_entries:
+            self.evict()
+        self.db.commit()
+
+    def flush(self):
+        if self.touched:
+            self.db.executemany('UPDATE results SET atime = ? WHERE key = ?',
+                                [(t, k) for k, t in self.touched.items()])
+            self.touched.clear()
+
+    def evict(self):
+        # Evict down to 90% capacity so eviction isn't paid on every put
+        self.flush()
+        excess = self.size - int(self.max_entries * 0.9)
+        self.db.execute('DELETE FROM results WHERE key IN '
+                        '(SELECT key FROM results ORDER BY atime LIMIT ?)',
+                        (excess,))
+        self.size = self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def clear(self):
+        self.touched.clear()
+        self.db.execute('DELETE FROM results')
+        self.db.commit()
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        self.db.commit()
+        self.db.close()
+
+    def __len__(self):
+        return self.size
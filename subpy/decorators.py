@@ -0,0 +1,124 @@
+import ast
+import sys
+import copy
+import types
+import hashlib
+
+from . import __version__
+from . import bytecode
+from .validate import Validator, LibraryNotSupported, featuremask, rules_key, \
+    _errors
+
+#------------------------------------------------------------------------
+# Subset Decorator
+#------------------------------------------------------------------------
+
+# Code key -> verdict, for every function validated in this process
+verdicts = {}
+
+class FunctionValidator(Validator):
+    """ Validator for a function's definition apart from its
+    decorators, which are applied where the function is defined rather
+    than run as part of it, and which include the ``subset`` line. """
+
+    def visit(self, node):
+        # Functions found without the source cache are parsed as a
+        # module holding just their definition
+        if isinstance(node, ast.Module) and len(node.body) == 1:
+            node = node.body[0]
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            node = copy.copy(node)
+            node.decorator_list = []
+        super(FunctionValidator, self).visit(node)
+
+def hash_code(code, h):
+    h.update(code.co_code)
+    h.update(repr((
+        code.co_flags,
+        code.co_argcount,
+        code.co_posonlyargcount,
+        code.co_kwonlyargcount,
+        code.co_names,
+        code.co_varnames,
+        code.co_freevars,
+        code.co_cellvars,
+    )).encode('utf-8'))
+    # Line numbers relative to the first line, as violations report them
+    h.update(getattr(code, 'co_linetable', None) or code.co_lnotab)
+
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            hash_code(const, h)
+        elif isinstance(const, frozenset):
+            # Set order isn't stable across processes
+            h.update(repr(sorted(map(repr, const))).encode('utf-8'))
+        else:
+            h.update(repr((type(const), const)).encode('utf-8'))
+
+def code_key(fn, mask, libraries):
+    """ Key identifying a function's code, and so its verdict, for a
+    feature mask and library list. Identical functions have the same
+    key wherever and however often they're defined. Like the verdict
+    the key leaves out the function's decorators. """
+    h = hashlib.blake2b(digest_size=20)
+    hash_code(fn.__code__, h)
+    h.update(repr((
+        bool(fn.__defaults__ or fn.__kwdefaults__),
+        mask,
+        list(libraries),
+        rules_key(),
+        __version__,
+        sys.version_info[:2],
+    )).encode('utf-8'))
+    return 'subset:' + h.hexdigest()
+
+def verdict(fn, features, libraries):
+    # The first violation as its class name and arguments, checked from
+    # the source or, for functions without one, from the bytecode.
+    try:
+        errors = FunctionValidator(features, libraries, collect=True, max_errors=1)(fn)
+        return tuple((type(e).__name__, e.args) for e in errors)
+    except (OSError, TypeError):
+        pass
+
+    try:
+        found = bytecode.checker(fn, features, libraries)
+    except LibraryNotSupported as e:
+        return (('LibraryNotSupported', e.args),)
+
+    for feature, lines in sorted(found.items(), key=lambda x: x[1][0]):
+        return (('FeatureNotSupported', (feature, ('<stdin>', lines[0], 1, None))),)
+    return ()
+
+def subset(features, libraries=None, cache=None):
+    """ Decorator raising ``FeatureNotSupported`` at definition time if
+    the function uses features or libraries outside the subset.
+
+    Verdicts are memoized by a hash of the function's code object and
+    the feature set, so defining the same function again doesn't check
+    it again. With a ``ResultCache`` the verdicts are kept across
+    processes too. The function's own decorators aren't checked.
+    Functions without source are checked from their bytecode, which
+    only finds the features in ``bytecode.detectable``. """
+    features = set(features)
+    libraries = list(libraries or ())
+    mask = featuremask(features)
+
+    def decorate(fn):
+        key = code_key(fn, mask, libraries)
+        found = verdicts.get(key)
+        if found is None and cache is not None:
+            found = cache.get(key)
+
+        if found is None:
+            found = verdict(fn, features, libraries)
+            if cache is not None:
+                cache.put(key, found)
+
+        verdicts[key] = found
+        if found:
+            name, args = found[0]
+            raise _errors[name](*args)
+        return fn
+
+    return decorate
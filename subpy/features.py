@@ -36,3 +36,14 @@ SetComp         = 31
 CustomIterators = 32
 Printing        = 33
 Metaclasses     = 34
+AsyncAwait      = 35
+FStrings        = 36
+NamedExpr       = 37
+PatternMatching = 38
+
+#------------------------------------------------------------------------
+# Names
+#------------------------------------------------------------------------
+
+FeatureNames = dict((code, name) for name, code in list(globals().items())
+                    if isinstance(code, int) and not name.startswith('_'))
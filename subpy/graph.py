@@ -0,0 +1,217 @@
+import os
+import ast
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .validate import Checker, compile_libraries, parse, worker_pool, _read
+
+#------------------------------------------------------------------------
+# Module Resolution
+#------------------------------------------------------------------------
+
+def find_module(name, roots):
+    """ The file of a first-party module under one of the roots, or
+    None if the module isn't first-party. """
+    for root in roots:
+        base = os.path.join(root, *name.split('.'))
+        if os.path.isfile(base + '.py'):
+            return base + '.py'
+        init = os.path.join(base, '__init__.py')
+        if os.path.isfile(init):
+            return init
+    return None
+
+def module_name(path, roots):
+    path = os.path.abspath(path)
+    for root in roots:
+        rel = os.path.relpath(path, os.path.abspath(root))
+        if not rel.startswith(os.pardir):
+            parts = rel[:-3].split(os.sep)
+            if parts[-1] == '__init__':
+                parts.pop()
+            return '.'.join(parts)
+    raise ValueError('%s is not under any of %r' % (path, roots))
+
+def imported(node, name, is_package):
+    """ Names of the modules an import statement in module ``name`` may
+    load, most specific last, with the name and line the library check
+    reports for each absolute import. """
+    if isinstance(node, ast.Import):
+        for alias in node.names:
+            parts = alias.name.split('.')
+            mods = ['.'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+            yield mods, alias.name
+
+    elif node.level:
+        package = name.split('.') if is_package else name.split('.')[:-1]
+        base = package[:len(package) - node.level + 1]
+        if node.module:
+            base = base + node.module.split('.')
+        for alias in node.names:
+            mods = ['.'.join(base[:i]) for i in range(1, len(base) + 1)]
+            if alias.name != '*':
+                mods.append('.'.join(base + [alias.name]))
+            yield mods, None
+
+    elif node.module:
+        parts = node.module.split('.')
+        for alias in node.names:
+            mods = ['.'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+            if alias.name != '*':
+                mods.append(node.module + '.' + alias.name)
+            yield mods, node.module + '.' + alias.name
+
+def check_module(name, path, roots, features, libraries):
+    """ Check one module, returning its features, the libraries it
+    imports from outside the allowed list and the first-party modules
+    it imports. """
+    source = _read(path)
+    tree = parse(source)
+    result = Checker(features, [])(tree)
+
+    matcher = libraries and compile_libraries(libraries)
+    is_package = os.path.basename(path) == '__init__.py'
+    nolibs = []
+    deps = {}
+
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        for mods, library in imported(node, name, is_package):
+            found = [(mod, find_module(mod, roots)) for mod in mods]
+            found = [(mod, p) for mod, p in found if p]
+            deps.update(found)
+
+            ## Check for unsupported libraries
+            if matcher and library and not found and not matcher(library):
+                nolibs.append((library, node.lineno))
+
+    deps.pop(name, None)
+    return result, sorted(nolibs, key=lambda x: x[1]), deps
+
+#------------------------------------------------------------------------
+# Import Graph
+#------------------------------------------------------------------------
+
+class ImportGraph(object):
+    """ The first-party modules reachable by import from an entry
+    module, each checked once, with the import chain that brings each
+    one in. Modules that can't be read or parsed are kept in
+    ``errors``. """
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.paths = {}
+        self.edges = {}
+        self.results = {}
+        self.libraries = {}
+        self.errors = {}
+
+    def add(self, name, result, nolibs, deps):
+        self.results[name] = result
+        self.libraries[name] = nolibs
+        self.edges[name] = sorted(deps)
+
+    def parents(self):
+        """ The module each module is first imported from on a shortest
+        chain from the entry module, found in one pass over the
+        graph. """
+        parents = {self.entry: None}
+        queue = deque([self.entry])
+        while queue:
+            mod = queue.popleft()
+            for dep in self.edges.get(mod, ()):
+                if dep not in parents:
+                    parents[dep] = mod
+                    queue.append(dep)
+        return parents
+
+    def chain(self, name, parents=None):
+        """ The shortest chain of imports from the entry module to the
+        named module. """
+        if parents is None:
+            parents = self.parents()
+        if name not in parents:
+            return None
+        chain = []
+        while name is not None:
+            chain.append(name)
+            name = parents[name]
+        return chain[::-1]
+
+    def violations(self):
+        """ Yield ``(chain, feature, lines)`` for every feature used and
+        ``(chain, library, [line])`` for every library imported outside
+        the allowed list, where the last module in the chain is the one
+        that introduced it. """
+        parents = self.parents()
+        for name in sorted(self.results):
+            chain = self.chain(name, parents)
+            for feature, lines in sorted(self.results[name].items()):
+                yield chain, feature, lines
+            for library, line in self.libraries[name]:
+                yield chain, library, [line]
+
+    def __len__(self):
+        return len(self.paths)
+
+def check_imports(entry, features=None, libraries=None, roots=None,
+                  workers=None):
+    """ Check a module and every first-party module it imports,
+    directly or not. ``entry`` is a path to a ``.py`` file or a module
+    name under ``roots``, which default to the entry file's directory.
+    Modules are checked in parallel as they're discovered and each is
+    checked once however many modules import it. Imports of first-party
+    modules are allowed whatever the library list. """
+    features = features or set()
+    libraries = libraries or list()
+    workers = workers or os.cpu_count() or 1
+
+    if entry.endswith('.py'):
+        roots = roots or [os.path.dirname(os.path.abspath(entry))]
+        path, name = entry, module_name(entry, roots)
+    else:
+        roots = roots or [os.getcwd()]
+        path, name = find_module(entry, roots), entry
+        if path is None:
+            raise ValueError('No module %s under %r' % (entry, roots))
+
+    graph = ImportGraph(name)
+    graph.paths[name] = path
+    args = (roots, features, libraries)
+
+    def done(name, fn, *a):
+        try:
+            result = fn(*a)
+        except (SyntaxError, ValueError, OSError) as e:
+            graph.errors[name] = e
+            graph.edges[name] = []
+            return ()
+        graph.add(name, *result)
+        return [(dep, p) for dep, p in sorted(result[2].items())
+                if dep not in graph.paths]
+
+    if workers == 1:
+        queue = deque([(name, path)])
+        while queue:
+            name, path = queue.popleft()
+            for dep, p in done(name, check_module, name, path, *args):
+                graph.paths[dep] = p
+                queue.append((dep, p))
+        return graph
+
+    pool = worker_pool(workers)
+    try:
+        pending = {pool.submit(check_module, name, path, *args): name}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = pending.pop(future)
+                for dep, p in done(name, future.result):
+                    graph.paths[dep] = p
+                    pending[pool.submit(check_module, dep, p, *args)] = dep
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+    return graph
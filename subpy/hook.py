@@ -0,0 +1,125 @@
+import os
+import sys
+import hashlib
+import importlib.abc
+import importlib.util
+import importlib.machinery
+
+from . import __version__
+from .validate import Validator, LineIndex, parse, rules_key, _errors
+
+#------------------------------------------------------------------------
+# Import Hook
+#------------------------------------------------------------------------
+
+class ValidatingLoader(importlib.machinery.SourceFileLoader):
+    """ Source loader that validates a module before it is executed.
+    The source is read once, and when it has to be compiled the tree
+    that was validated is the one compiled. A source whose verdict is
+    cached isn't parsed at all and loads from its ``.pyc`` as usual. """
+
+    def __init__(self, fullname, path, finder):
+        super(ValidatingLoader, self).__init__(fullname, path)
+        self.finder = finder
+        self.data = None
+        self.tree = None
+
+    def get_data(self, path):
+        if self.data is not None and path == self.path:
+            return self.data
+        return super(ValidatingLoader, self).get_data(path)
+
+    def get_code(self, fullname):
+        self.data = self.get_data(self.path)
+        try:
+            self.tree = self.finder.validate(self.data, self.path)
+            return super(ValidatingLoader, self).get_code(fullname)
+        finally:
+            self.data = None
+            self.tree = None
+
+    def source_to_code(self, data, path, *args, **kwargs):
+        if self.tree is None:
+            return super(ValidatingLoader, self).source_to_code(data, path, *args, **kwargs)
+        return compile(self.tree, path, 'exec', dont_inherit=True,
+                       optimize=kwargs.get('_optimize', -1))
+
+class SubsetFinder(importlib.abc.MetaPathFinder):
+    """ Meta path finder that validates every module loaded from source
+    under the given directories against a feature set and library list,
+    raising ``FeatureNotSupported`` from the import of a module that
+    doesn't conform.
+
+    Verdicts are kept by a hash of the source, in memory and, if a
+    ``ResultCache`` is given, on disk so that later processes importing
+    unchanged modules skip validating them. """
+
+    def __init__(self, paths, features, libraries=None, cache=None):
+        self.paths = tuple(os.path.join(os.path.abspath(p), '') for p in paths)
+        self.features = features
+        self.libraries = libraries or list()
+        self.cache = cache
+        self.verdicts = {}
+        self.config = repr((sorted(features), list(self.libraries), rules_key(),
+                            __version__, sys.version_info[:2])).encode('utf-8')
+
+    def find_spec(self, fullname, path=None, target=None):
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is None or not isinstance(spec.loader, importlib.machinery.SourceFileLoader):
+            return None
+        if not os.path.abspath(spec.origin).startswith(self.paths):
+            return None
+
+        spec.loader = ValidatingLoader(fullname, spec.origin, self)
+        return spec
+
+    def key(self, data):
+        h = hashlib.blake2b(data, digest_size=20)
+        h.update(self.config)
+        return 'hook:' + h.hexdigest()
+
+    def validate(self, data, path):
+        """ Validate the source bytes of a module, returning the parsed
+        tree when it had to be parsed or None if the verdict was
+        cached. """
+        key = self.key(data)
+        verdict = self.verdicts.get(key)
+        if verdict is None and self.cache is not None:
+            verdict = self.cache.get(key)
+
+        tree = None
+        if verdict is None:
+            source = importlib.util.decode_source(data)
+            tree = parse(source)
+            v = Validator(self.features, self.libraries, collect=True, max_errors=1)
+            errors = v(tree)
+
+            # Validated without its source, the error is given its line
+            # text from the module
+            lines = LineIndex(source)
+            verdict = tuple((type(e).__name__,
+                             (e.msg, e.lineno, e.offset, lines.line(e.lineno)))
+                            for e in errors)
+
+            if self.cache is not None:
+                self.cache.put(key, verdict)
+
+        self.verdicts[key] = verdict
+        if verdict:
+            name, (msg, lineno, offset, text) = verdict[0]
+            raise _errors[name](msg, (path, lineno, offset, text))
+        return tree
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+def install(paths, features, libraries=None, cache=None):
+    """ Validate every module imported from source under ``paths``
+    against the features and libraries from now on. """
+    return SubsetFinder(paths, features, libraries, cache).install()
@@ -0,0 +1,90 @@
+import ast
+from collections import defaultdict
+
+from .validate import Checker
+
+#------------------------------------------------------------------------
+# Incremental Checker
+#------------------------------------------------------------------------
+
+class IncrementalChecker(object):
+    """ Checker for a module that is re-checked after every edit, such
+    as the buffer of an editor. Results are kept per top-level
+    statement, and after an edit only the statements spanning lines
+    that changed are re-parsed and walked. The result of each call is
+    the same as ``checker`` over the whole source. """
+
+    def __init__(self, features=None, libraries=None):
+        self.checker = Checker(features or set(), libraries or list())
+        self.lines = None
+
+        # Blocks of the current source as (first line, last line, key),
+        # and the results of each distinct key relative to its first
+        # line.
+        self.blocks = []
+        self.results = {}
+
+    def __call__(self, source):
+        lines = source.splitlines(True)
+        if self.lines is None:
+            blocks = self.parse(lines, 0, len(lines))
+        else:
+            blocks = self.update(lines)
+
+        self.lines = lines
+        self.blocks = blocks
+        self.results = dict((key, self.results[key]) for _, _, key in blocks)
+
+        detected = defaultdict(list)
+        for first, last, key in blocks:
+            for feature, linenos in self.results[key].items():
+                detected[feature].extend(first + lineno for lineno in linenos)
+        return dict(detected)
+
+    def update(self, lines):
+        old = self.lines
+
+        # Find the lines that changed as the span between the longest
+        # common prefix and suffix of the old and new source.
+        n = min(len(old), len(lines))
+        prefix = 0
+        while prefix < n and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < n - prefix and old[-1-suffix] == lines[-1-suffix]:
+            suffix += 1
+
+        before = [b for b in self.blocks if b[1] <= prefix]
+        after = [b for b in self.blocks if b[0] > len(old) - suffix]
+
+        start = before[-1][1] if before else 0
+        end = after[0][0] - 1 if after else len(old)
+        delta = len(lines) - len(old)
+
+        # An edit that only parses in the context of the lines around
+        # it, such as an unterminated string, needs the whole source.
+        try:
+            changed = self.parse(lines, start, end + delta)
+        except SyntaxError:
+            return self.parse(lines, 0, len(lines))
+
+        shifted = [(first + delta, last + delta, key) for first, last, key in after]
+        return before + changed + shifted
+
+    def parse(self, lines, start, end):
+        tree = ast.parse(''.join(lines[start:end]))
+        ast.increment_lineno(tree, start)
+
+        blocks = []
+        for stmt in tree.body:
+            first = min([stmt.lineno] + [d.lineno for d in getattr(stmt, 'decorator_list', ())])
+            last = stmt.end_lineno
+
+            # Statements sharing a line are told apart by their columns
+            key = (''.join(lines[first-1:last]), stmt.col_offset, stmt.end_col_offset)
+            if key not in self.results:
+                detected = self.checker(stmt)
+                self.results[key] = dict((feature, [lineno - first for lineno in linenos])
+                                         for feature, linenos in detected.items())
+            blocks.append((first, last, key))
+        return blocks
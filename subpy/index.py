@@ -0,0 +1,179 @@
+import os
+import ast
+import sqlite3
+from collections import defaultdict
+
+from .features import FeatureNames
+from .validate import featuremask, scan_paths, _iter_paths
+
+#------------------------------------------------------------------------
+# Feature Index
+#------------------------------------------------------------------------
+
+class FeatureIndex(object):
+    """ Persistent index of the features used by every module in a
+    corpus. Each module is stored with the bitmask of its detected
+    features and the index keeps a postings set per feature in memory,
+    so boolean queries over feature names don't touch the sources.
+
+        index = FeatureIndex('stdlib.db')
+        index.update(['/usr/lib/python3.11'])
+        index.query('Metaclasses & MInheritance')
+    """
+
+    def __init__(self, path=':memory:'):
+        directory = os.path.dirname(path)
+        if path != ':memory:' and directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS modules '
+                        '(path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, '
+                        'mask TEXT)')
+        self.db.commit()
+        self.load()
+
+    def load(self):
+        self.stamps = {}
+        self.masks = {}
+        self.postings = defaultdict(set)
+
+        for path, mtime, size, mask in self.db.execute('SELECT * FROM modules'):
+            self.stamps[path] = (mtime, size)
+            # Files that couldn't be read or parsed have no mask
+            if mask is not None:
+                self.index(path, int(mask))
+
+    def index(self, path, mask):
+        self.masks[path] = mask
+        feature = 0
+        while mask:
+            if mask & 1:
+                self.postings[feature].add(path)
+            mask >>= 1
+            feature += 1
+
+    def unindex(self, path):
+        for paths in self.postings.values():
+            paths.discard(path)
+        self.masks.pop(path, None)
+        del self.stamps[path]
+
+    def update(self, paths, workers=None):
+        """ Index every file (or every ``.py`` file under every
+        directory) in ``paths``, re-checking only the files whose
+        modification time or size changed since they were indexed.
+        Indexed files under ``paths`` that no longer exist are dropped.
+        Returns the number of files (re)indexed. Files that can't be
+        read or parsed are left out of the index, and aren't checked
+        again until they change. """
+        paths = list(paths)
+        seen = set()
+        stale = []
+
+        for path in _iter_paths(paths):
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if self.stamps.get(path) != (st.st_mtime_ns, st.st_size):
+                stale.append((path, (st.st_mtime_ns, st.st_size)))
+
+        roots = tuple(os.path.join(p, '') for p in paths if os.path.isdir(p))
+        for path in list(self.stamps):
+            if path in seen or not (path in paths or path.startswith(roots)):
+                continue
+            if not os.path.exists(path):
+                self.remove(path)
+
+        stamps = dict(stale)
+        results = scan_paths([path for path, _ in stale], workers=workers,
+                             errors='return')
+
+        count = 0
+        for path, result in results:
+            if path in self.stamps:
+                self.remove(path)
+
+            mtime, size = stamps[path]
+            self.stamps[path] = (mtime, size)
+            if isinstance(result, Exception):
+                # Stamped without a mask, so it's skipped until it changes
+                self.db.execute('INSERT OR REPLACE INTO modules VALUES '
+                                '(?, ?, ?, NULL)', (path, mtime, size))
+                continue
+
+            mask = featuremask(result)
+            self.db.execute('INSERT OR REPLACE INTO modules VALUES (?, ?, ?, ?)',
+                            (path, mtime, size, str(mask)))
+            self.index(path, mask)
+            count += 1
+
+        self.db.commit()
+        return count
+
+    def remove(self, path):
+        self.db.execute('DELETE FROM modules WHERE path = ?', (path,))
+        self.unindex(path)
+
+    def features(self, path):
+        """ The set of features used by an indexed file. """
+        mask = self.masks[path]
+        return set(f for f in FeatureNames if mask & (1 << f))
+
+    def query(self, expr):
+        """ Files using a combination of features, given either as a
+        feature code or as an expression over feature names with
+        ``&``, ``|``, ``~`` (or ``and``, ``or``, ``not``) and
+        parentheses, e.g. ``'Metaclasses & ~Inheritance'``. """
+        if isinstance(expr, int):
+            return sorted(self.postings.get(expr, ()))
+
+        try:
+            tree = ast.parse(expr.strip(), mode='eval')
+        except SyntaxError:
+            raise ValueError('Invalid query: %r' % expr)
+        return sorted(self.evaluate(tree.body))
+
+    def evaluate(self, node):
+        if isinstance(node, ast.Name):
+            # Looked up each time, as custom features may have been
+            # registered since the index was opened
+            codes = dict((name, code) for code, name in FeatureNames.items())
+            if node.id not in codes:
+                raise ValueError('Unknown feature: %s' % node.id)
+            return self.postings.get(codes[node.id], set())
+
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+            return self.evaluate(node.left) & self.evaluate(node.right)
+
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+            return self.evaluate(node.left) | self.evaluate(node.right)
+
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Sub):
+            return self.evaluate(node.left) - self.evaluate(node.right)
+
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Invert, ast.Not)):
+            return set(self.masks) - self.evaluate(node.operand)
+
+        elif isinstance(node, ast.BoolOp):
+            sets = [self.evaluate(value) for value in node.values]
+            if isinstance(node.op, ast.And):
+                return set.intersection(*sets)
+            else:
+                return set.union(*sets)
+
+        raise ValueError('Unsupported query syntax: %s' % ast.dump(node))
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return len(self.masks)
+
+    def __contains__(self, path):
+        return path in self.masks
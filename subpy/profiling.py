@@ -0,0 +1,156 @@
+import time
+import marshal
+from collections import defaultdict
+
+#------------------------------------------------------------------------
+# Profiling
+#------------------------------------------------------------------------
+
+def _label(fn):
+    # Custom rules are labelled by the predicate they wrap
+    code = getattr(fn, '__wrapped__', fn).__code__
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+class Profile(object):
+    """ Call counts and cumulative time for every node type visited and
+    every check run by the visitors it is attached to, along with the
+    parse and walk time of each source they check.
+
+    Attaching swaps timed wrappers into the visitor's dispatch table and
+    over its parse and walk, and detaching restores the originals, so
+    visitors that aren't being profiled run exactly as before.
+
+        profile = Profile()
+        check = profile.attach(Checker(features, libraries))
+        check(source)
+        profile.dump('subpy.prof')   # read with pstats.Stats
+    """
+
+    def __init__(self):
+        # (node type name, check label) -> [calls, time]
+        self.checks = defaultdict(lambda: [0, 0.0])
+        # node type name -> [calls, time]
+        self.nodes = defaultdict(lambda: [0, 0.0])
+        # [parse time, walk time] per source checked
+        self.sources = []
+        self.saved = {}
+
+    def attach(self, visitor):
+        self.saved[id(visitor)] = visitor._dispatch
+        visitor._dispatch = self.instrument(visitor._dispatch)
+
+        visitor.parse = self.timed(visitor.parse, 0, new=True)
+        visitor.visit = self.timed(visitor.visit, 1)
+        visitor.visit_limited = self.timed(visitor.visit_limited, 1)
+        return visitor
+
+    def detach(self, visitor):
+        visitor._dispatch = self.saved.pop(id(visitor))
+        for name in ('parse', 'visit', 'visit_limited'):
+            visitor.__dict__.pop(name, None)
+        return visitor
+
+    def instrument(self, dispatch):
+        return dict((nodetype, ((self.visitor(nodetype.__name__, enabled),),
+                                fields, kind))
+                    for nodetype, (enabled, fields, kind) in dispatch.items())
+
+    def visitor(self, name, enabled):
+        node = self.nodes[name]
+        timed = tuple((fn, self.checks[name, _label(fn)]) for fn in enabled)
+        clock = time.perf_counter
+
+        def visit(self, n):
+            start = clock()
+            for fn, stats in timed:
+                t = clock()
+                fn(self, n)
+                stats[0] += 1
+                stats[1] += clock() - t
+            node[0] += 1
+            node[1] += clock() - start
+
+        return visit
+
+    def timed(self, fn, slot, new=False):
+        # A source walked without being parsed (a tree, or a function
+        # from an already cached file) still starts a new entry.
+        sources = self.sources
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            if new or not sources or sources[-1][slot] is not None:
+                sources.append([None, None])
+            start = clock()
+            try:
+                return fn(*args)
+            finally:
+                sources[-1][slot] = clock() - start
+
+        return wrapper
+
+    # -------------------------------------------------
+
+    def parse_time(self):
+        return sum(parse or 0.0 for parse, walk in self.sources)
+
+    def walk_time(self):
+        return sum(walk or 0.0 for parse, walk in self.sources)
+
+    def to_dict(self):
+        """ Totals as plain data: per check and per node type call
+        counts and times, and parse and walk time per source. """
+        checks = {}
+        for (name, label), (calls, total) in self.checks.items():
+            entry = checks.setdefault(label[2], {'calls': 0, 'time': 0.0})
+            entry['calls'] += calls
+            entry['time'] += total
+
+        return {
+            'checks': checks,
+            'nodes': dict(('visit_%s' % name, {'calls': calls, 'time': total})
+                          for name, (calls, total) in self.nodes.items()),
+            'sources': [{'parse': parse or 0.0, 'walk': walk or 0.0}
+                        for parse, walk in self.sources],
+            'parse': self.parse_time(),
+            'walk': self.walk_time(),
+        }
+
+    def stats(self):
+        """ Timings in the form ``pstats`` loads, with node types as
+        ``visit_<Node>`` functions called from the walk and checks
+        called from the node types they run on. """
+        walk = ('~', 0, '<walk>')
+        parse = ('~', 0, '<parse>')
+        nparse = sum(1 for p, w in self.sources if p is not None)
+        nwalk = sum(1 for p, w in self.sources if w is not None)
+
+        own = dict((name, total) for name, (calls, total) in self.nodes.items())
+        callers = defaultdict(dict)
+        for (name, label), (calls, total) in self.checks.items():
+            own[name] -= total
+            callers[label][('~', 0, 'visit_%s' % name)] = (calls, calls, total, total)
+
+        stats = {}
+        stats[parse] = (nparse, nparse, self.parse_time(), self.parse_time(), {})
+
+        nodes_total = 0.0
+        for name, (calls, total) in self.nodes.items():
+            nodes_total += total
+            stats[('~', 0, 'visit_%s' % name)] = (
+                calls, calls, own[name], total,
+                {walk: (calls, calls, own[name], total)})
+
+        for label, by in callers.items():
+            calls = sum(c for c, _, _, _ in by.values())
+            total = sum(t for _, _, t, _ in by.values())
+            stats[label] = (calls, calls, total, total, by)
+
+        stats[walk] = (nwalk, nwalk, self.walk_time() - nodes_total,
+                       self.walk_time(), {})
+        return stats
+
+    def dump(self, filename):
+        """ Write the timings as a ``pstats`` compatible profile. """
+        with open(filename, 'wb') as fd:
+            marshal.dump(self.stats(), fd)
@@ -0,0 +1,106 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from collections import defaultdict
+
+from .validate import PythonVisitor
+
+#------------------------------------------------------------------------
+# Columnar Results
+#------------------------------------------------------------------------
+
+class Results(object):
+    """ Sites found across many files, stored as parallel arrays of file
+    id, feature, line and column rather than a dict of lists per file.
+    Rows for a file are contiguous and files are numbered in the order
+    they were added. """
+
+    def __init__(self):
+        self.files = []
+        self.file = array('I')
+        self.feature = array('I')
+        self.line = array('I')
+        self.col = array('I')
+
+    def __len__(self):
+        return len(self.feature)
+
+    def columns(self):
+        return (self.file, self.feature, self.line, self.col)
+
+    def add(self, name, source, features=None, libraries=None):
+        """ Check a source and append its sites under the given name,
+        returning its file id. """
+        fileid = len(self.files)
+        rows = len(self)
+
+        d = Columns(features or set(), libraries or list(), self, fileid)
+        try:
+            d(source)
+        except BaseException:
+            for column in self.columns():
+                del column[rows:]
+            raise
+
+        self.files.append(name)
+        return fileid
+
+    def add_result(self, name, result):
+        """ Append a result in the shape ``checker`` returns, which has
+        no columns, so they are recorded as 0. """
+        fileid = len(self.files)
+        self.files.append(name)
+        for feature, linenos in result.items():
+            self.file.extend([fileid] * len(linenos))
+            self.feature.extend([feature] * len(linenos))
+            self.line.extend(linenos)
+            self.col.extend([0] * len(linenos))
+        return fileid
+
+    def extend(self, other):
+        """ Append every file of another set of results. """
+        offset = len(self.files)
+        self.files.extend(other.files)
+        if offset:
+            self.file.extend(array('I', map(offset.__add__, other.file)))
+        else:
+            self.file.extend(other.file)
+        self.feature.extend(other.feature)
+        self.line.extend(other.line)
+        self.col.extend(other.col)
+
+    def rows(self, fileid):
+        """ The range of rows for a file. """
+        return bisect_left(self.file, fileid), bisect_right(self.file, fileid)
+
+    def using(self, feature):
+        """ Names of the files using a feature. """
+        ids = set(compress(self.file, map(feature.__eq__, self.feature)))
+        return [self.files[i] for i in sorted(ids)]
+
+    def to_dict(self, fileid):
+        """ Sites of one file in the shape ``checker`` returns. """
+        start, stop = self.rows(fileid)
+        detected = defaultdict(list)
+        for feature, lineno in zip(self.feature[start:stop], self.line[start:stop]):
+            detected[feature].append(lineno)
+        return dict(detected)
+
+    def to_dicts(self):
+        return dict((name, self.to_dict(i)) for i, name in enumerate(self.files))
+
+class Columns(PythonVisitor):
+    """ Append sites for features that don't conform to the given
+    feature set directly to the columns of a Results. """
+
+    def __init__(self, features, libraries, results, fileid):
+        super(Columns, self).__init__(features, libraries)
+        self.results = results
+        self.fileid = fileid
+
+    def action(self, node, feature):
+        results = self.results
+        results.file.append(self.fileid)
+        results.feature.append(feature)
+        results.line.append(node.lineno - self.lineoffset)
+        results.col.append(node.col_offset - self.coloffset)
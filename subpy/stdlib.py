@@ -1,10 +1,11 @@
 import os
-import distutils.sysconfig as sysconfig
+import sysconfig
+from importlib.util import find_spec
 
 jokes = ['antigravity', 'this', 'dbhash', 'bsddb']
 
 def standard_library():
-    std_lib = sysconfig.get_python_lib(standard_lib=True)
+    std_lib = sysconfig.get_path('stdlib')
 
     for top, dirs, files in os.walk(std_lib):
         for nm in files:
@@ -28,7 +29,6 @@ def standard_library():
                    (pack not in jokes):
                     yield pack
 
-# Python 3.x, todo, this has changed
 libraries = [
      'ihooks',
      'quopri',
@@ -240,3 +240,11 @@ libraries = [
      'ctypes',
      'logging'
  ]
+
+def has_source(name):
+    spec = find_spec(name)
+    return bool(spec and spec.origin and spec.origin.endswith('.py'))
+
+# Modules that were dropped or renamed in Python 3, or that are built
+# into the interpreter without a source file, are left out
+libraries = [lib for lib in libraries if has_source(lib)]
@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+#------------------------------------------------------------------------
+# Temporary Trees
+#------------------------------------------------------------------------
+
+def write_tree(root, files):
+    """ Write ``files``, a mapping of paths relative to ``root`` to their
+    source, creating directories as needed. """
+    for name, source in files.items():
+        path = os.path.join(root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fd:
+            fd.write(source)
+
+class TreeTestCase(unittest.TestCase):
+    """ Test case run against a fresh temporary directory ``root``
+    holding the class's ``files``. """
+
+    files = {}
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        write_tree(self.root, self.files)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def write(self, name, source):
+        write_tree(self.root, {name: source})
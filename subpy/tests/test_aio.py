@@ -0,0 +1,152 @@
+import time
+import asyncio
+import unittest
+
+from subpy import checker, validator, FeatureNotSupported, FeaturesNotSupported
+from subpy import aio
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+def slow(delay):
+    # Stands in for a check, returning when it ran
+    start = time.time()
+    time.sleep(delay)
+    return start, time.time()
+
+def overlap(spans):
+    # The most spans running at any one time
+    events = sorted([(s, 1) for s, e in spans] + [(e, -1) for s, e in spans])
+    running = peak = 0
+    for _, step in events:
+        running += step
+        peak = max(peak, running)
+    return peak
+
+class TestAsync(unittest.TestCase):
+
+    source = 'xs = [x for x in range(10)]\nf = lambda x: x\n'
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_checker(self):
+        async def main():
+            async with aio.AsyncChecker(workers=2) as c:
+                return await c.checker(self.source, set([f.Lambda]))
+
+        self.assertEqual(self.run_async(main()),
+                         checker(self.source, set([f.Lambda])))
+
+    def test_validator(self):
+        async def main():
+            async with aio.AsyncChecker(workers=1) as c:
+                await c.validator(self.source, set([f.Lambda]))
+
+        with self.assertRaises(FeatureNotSupported) as cm:
+            self.run_async(main())
+        self.assertEqual((cm.exception.msg, cm.exception.lineno), (f.ListComp, 1))
+
+    def test_validator_collect(self):
+        # Collected violations are raised together, as by validator
+        async def main():
+            async with aio.AsyncChecker(workers=1) as c:
+                self.assertEqual(await c.validator('x = 1', collect=True), None)
+                await c.validator(self.source, collect=True)
+
+        with self.assertRaises(FeaturesNotSupported) as cm:
+            self.run_async(main())
+        with self.assertRaises(FeaturesNotSupported) as sync:
+            validator(self.source, collect=True)
+        self.assertEqual([e.args for e in cm.exception.errors],
+                         [e.args for e in sync.exception.errors])
+
+    def test_defaults(self):
+        detected = self.run_async(aio.detect(self.source))
+        self.assertEqual(set(detected), set([f.ListComp, f.Lambda]))
+
+    def test_backpressure(self):
+        async def main():
+            async with aio.AsyncChecker(workers=4, max_pending=2) as c:
+                jobs = [c.run(slow, 0.1) for i in range(6)]
+                return await asyncio.gather(*jobs)
+
+        self.assertEqual(overlap(self.run_async(main())), 2)
+
+    def test_timeout(self):
+        # The caller gets control back at once, without the loop
+        # stalling, but the slot is held until the worker is done
+        async def main():
+            async with aio.AsyncChecker(workers=1, max_pending=1) as c:
+                ticks = []
+                async def tick():
+                    while True:
+                        ticks.append(time.time())
+                        await asyncio.sleep(0.01)
+                ticker = asyncio.ensure_future(tick())
+
+                start = time.time()
+                try:
+                    await c.run(slow, 0.5, timeout=0.05)
+                except asyncio.TimeoutError:
+                    timed_out = time.time() - start
+                else:
+                    self.fail('expected a timeout')
+
+                span = await c.run(slow, 0)
+                ticker.cancel()
+                stall = max(b - a for a, b in zip(ticks, ticks[1:]))
+                return timed_out, stall, span[0] - start
+
+        timed_out, stall, second = self.run_async(main())
+        self.assertTrue(timed_out < 0.3)
+        self.assertTrue(stall < 0.3)
+        self.assertTrue(second >= 0.45)
+
+    def test_cancel(self):
+        async def main():
+            async with aio.AsyncChecker(workers=1, max_pending=1) as c:
+                await c.run(slow, 0)
+                task = asyncio.ensure_future(c.run(slow, 0.3))
+                await asyncio.sleep(0.05)
+                start = time.time()
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                cancelled = time.time() - start
+
+                span = await c.run(slow, 0)
+                return cancelled, span[0] - start
+
+        cancelled, second = self.run_async(main())
+        self.assertTrue(cancelled < 0.1)
+        self.assertTrue(second >= 0.2)
+
+    def test_closed_loops(self):
+        # Slots held by checks that time out are given back once their
+        # workers finish, even after the loops that took them closed
+        c = aio.AsyncChecker(workers=1, max_pending=2)
+
+        async def abandon():
+            try:
+                await c.run(slow, 0.1, timeout=0.01)
+            except asyncio.TimeoutError:
+                pass
+
+        try:
+            self.run_async(abandon())
+            self.run_async(abandon())
+            time.sleep(0.4)
+            self.assertEqual(c.slots.free, 2)
+
+            async def main():
+                return await asyncio.wait_for(c.run(slow, 0), 2)
+            self.run_async(main())
+        finally:
+            c.close()
+
+tests.append(TestAsync)
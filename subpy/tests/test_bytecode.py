@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+import py_compile
+
+from subpy import detect, LibraryNotSupported
+from subpy import bytecode
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+source = '''\
+class A(B, C, metaclass=M):
+    def g(self, *args, **kw):
+        def h():
+            pass
+        return 1, 2
+
+def fn(k=1):
+    try:
+        del x
+    except E:
+        raise
+    except F as e:
+        pass
+    with x:
+        pass
+    assert x
+    a, b = c
+    xs = [y for y in ys]
+    print(lambda: 0)
+    yield {y: 1 for y in ys}
+
+async def co():
+    await x
+    return f"{x}"
+
+from .mod import y
+'''
+
+class TestBytecode(unittest.TestCase):
+
+    def test_matches_source(self):
+        # Features found in bytecode are found at the same lines as in
+        # the source, though the source may have more sites for some
+        expected = detect(source)
+        found = bytecode.detect(compile(source, '<string>', 'exec'))
+
+        self.assertEqual(set(found), set(expected) & bytecode.detectable)
+        for feature in [f.Classes, f.Inheritance, f.MInheritance,
+                        f.Metaclasses, f.Closures, f.VarArgs,
+                        f.MultipleReturn, f.DelVar, f.ContextManagers,
+                        f.Assertions, f.TupleUnpacking, f.ListComp,
+                        f.Printing, f.Lambda, f.Generators, f.DictComp,
+                        f.AsyncAwait, f.FStrings, f.RelativeImports]:
+            self.assertEqual(found[feature], expected[feature])
+
+    def test_without_source(self):
+        namespace = {}
+        exec('def f(xs):\n    return [x for x in xs]\n', namespace)
+        fn = namespace['f']
+
+        self.assertEqual(bytecode.detect(fn), {f.ListComp: [2]})
+        self.assertEqual(bytecode.detect(fn.__code__), {f.ListComp: [2]})
+
+    def test_relative_lines(self):
+        def fn(x=None):
+            return lambda: x
+
+        self.assertEqual(bytecode.detect(fn), {f.KeywordArgs: [1], f.Lambda: [2]})
+        self.assertEqual(bytecode.detect(fn), detect(fn))
+
+    def test_pyc(self):
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, 'mod.py')
+            with open(path, 'w') as fd:
+                fd.write(source)
+            pyc = py_compile.compile(path, cfile=os.path.join(root, 'mod.pyc'))
+
+            code = compile(source, path, 'exec')
+            self.assertEqual(bytecode.detect(pyc), bytecode.detect(code))
+
+            with open(pyc, 'r+b') as fd:
+                fd.write(b'\0\0\0\0')
+            self.assertRaises(ValueError, bytecode.detect, pyc)
+        finally:
+            shutil.rmtree(root)
+
+    def test_checker(self):
+        code = compile('import os\nfrom math import sqrt\nxs = [x for x in y]\n',
+                       '<string>', 'exec')
+
+        self.assertEqual(bytecode.checker(code, set([f.ListComp])), {})
+        self.assertEqual(bytecode.checker(code, libraries=['os', 'math']),
+                         {f.ListComp: [3]})
+        self.assertRaises(LibraryNotSupported, bytecode.checker, code,
+                          libraries=['os'])
+
+    def test_no_code(self):
+        self.assertRaises(TypeError, bytecode.detect, len)
+
+tests.append(TestBytecode)
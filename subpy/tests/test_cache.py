@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from subpy import checker, validator, detect, ResultCache, FullPython, \
+    FeatureNotSupported
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestResultCache(unittest.TestCase):
+
+    source = 'xs = [x for x in range(10)]\nf = lambda x: x\n'
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.root, 'results.db'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.root)
+
+    def test_checker(self):
+        cold = checker(self.source, cache=self.cache)
+        warm = checker(self.source, cache=self.cache)
+
+        self.assertEqual(cold, checker(self.source))
+        self.assertEqual(cold, warm)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_keyed_on_config(self):
+        checker(self.source, cache=self.cache)
+        checker(self.source, features=set([f.Lambda]), cache=self.cache)
+        detect(self.source, cache=self.cache)
+
+        self.assertEqual(len(self.cache), 3)
+
+    def test_validator(self):
+        features = FullPython - set([f.ListComp])
+
+        for _ in range(2):
+            with self.assertRaises(FeatureNotSupported) as cm:
+                validator(self.source, features=features, cache=self.cache)
+            self.assertEqual(cm.exception.args[0], f.ListComp)
+            self.assertEqual(cm.exception.lineno, 1)
+
+        validator(self.source, features=FullPython, cache=self.cache)
+        validator(self.source, features=FullPython, cache=self.cache)
+
+    def test_persistence(self):
+        checker(self.source, cache=self.cache)
+        self.cache.close()
+
+        self.cache = ResultCache(self.cache.path)
+        key = self.cache.key('checker', self.source, set(), [])
+        self.assertEqual(self.cache.get(key), checker(self.source))
+
+    def test_eviction(self):
+        cache = ResultCache(':memory:', max_entries=10)
+        for i in range(25):
+            checker('x = %d\n' % i, cache=cache)
+
+        self.assertTrue(len(cache) <= 10)
+        key = cache.key('checker', 'x = 24\n', set(), [])
+        self.assertEqual(cache.get(key), {})
+
+    def test_replace(self):
+        # Putting a key again doesn't count it again
+        cache = ResultCache(':memory:', max_entries=10)
+        for i in range(9):
+            cache.put('k%d' % i, i)
+        for _ in range(5):
+            cache.put('k0', 0)
+
+        self.assertEqual(len(cache), 9)
+        self.assertEqual([cache.get('k%d' % i) for i in range(9)], list(range(9)))
+
+    def test_batched_atime(self):
+        # Hits don't write until a batch is full or the cache is closed
+        cache = ResultCache(os.path.join(self.root, 'batch.db'), batch=3)
+        for i, key in enumerate('abc'):
+            cache.put(key, i)
+        changes = cache.db.total_changes
+        cache.get('a')
+        cache.get('b')
+        cache.get('a')
+        self.assertEqual(cache.db.total_changes, changes)
+        cache.get('c')
+        self.assertEqual(cache.db.total_changes, changes + 3)
+
+        cache.get('a')
+        cache.close()
+        cache = ResultCache(cache.path)
+        self.assertEqual(cache.get('a'), 0)
+        cache.close()
+
+    def test_eviction_order(self):
+        # Recently read entries survive eviction though their access
+        # time hasn't been written yet
+        cache = ResultCache(':memory:', max_entries=10)
+        for i in range(10):
+            cache.put('k%d' % i, i)
+        cache.get('k0')
+        cache.put('k10', 10)
+
+        self.assertEqual(cache.get('k0'), 0)
+        self.assertEqual(cache.get('k1'), None)
+
+tests.append(TestResultCache)
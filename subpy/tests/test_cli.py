@@ -0,0 +1,53 @@
+import io
+import os
+import json
+
+from subpy.__main__ import main
+from subpy.tests.support import TreeTestCase
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestCommandLine(TreeTestCase):
+
+    files = {
+        'a.py': 'xs = [x for x in y]\n',
+        'b.py': 'import os.path\n',
+        'c.py': 'import socket\nimport os\nys = [y for y in x]\n',
+    }
+
+    def run_main(self, *argv):
+        out = io.StringIO()
+        status = main(list(argv), out=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        for line in lines:
+            line['path'] = os.path.basename(line['path'])
+        return status, lines
+
+    def test_conforms(self):
+        status, lines = self.run_main(self.path('b.py'), '--exclude', 'ListComp')
+
+        self.assertEqual(status, 0)
+        self.assertEqual(lines, [{'path': 'b.py', 'features': {}}])
+
+    def test_violations(self):
+        status, lines = self.run_main(self.root, '-x', 'ListComp', '-l', 'os',
+                                      '--jobs', '2')
+
+        self.assertEqual(status, 1)
+        self.assertEqual(lines, [
+            {'path': 'a.py', 'features': {'ListComp': [1]}, 'libraries': {}},
+            {'path': 'b.py', 'features': {}, 'libraries': {}},
+            {'path': 'c.py', 'features': {'ListComp': [3]},
+             'libraries': {'socket': [1]}},
+        ])
+
+    def test_errors(self):
+        self.write('d.py', 'x = (\n')
+
+        status, lines = self.run_main(self.root)
+        self.assertEqual(status, 2)
+        self.assertTrue(lines[-1]['error'].startswith('SyntaxError'))
+
+tests.append(TestCommandLine)
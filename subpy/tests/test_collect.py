@@ -0,0 +1,53 @@
+import unittest
+
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestCollect(unittest.TestCase):
+
+    source = '\n'.join([
+        'f = lambda x: x',
+        'xs = [x for x in range(10)]',
+        'del xs',
+        'g = lambda y: y',
+    ])
+
+    features = None
+
+    def setUp(self):
+        from subpy import FullPython
+        self.features = FullPython - set([f.Lambda, f.ListComp, f.DelVar])
+
+    def test_violations(self):
+        from subpy import violations
+
+        errors = violations(self.source, features=self.features)
+        self.assertEqual([(e.args[0], e.lineno, e.offset, e.text) for e in errors], [
+            (f.Lambda, 1, 5, 'f = lambda x: x'),
+            (f.ListComp, 2, 6, 'xs = [x for x in range(10)]'),
+            (f.DelVar, 3, 1, 'del xs'),
+            (f.Lambda, 4, 5, 'g = lambda y: y'),
+        ])
+
+    def test_max_errors(self):
+        from subpy import violations
+
+        errors = violations(self.source, features=self.features, max_errors=2)
+        self.assertEqual([e.lineno for e in errors], [1, 2])
+
+    def test_aggregate(self):
+        from subpy import validator, FeatureNotSupported, FeaturesNotSupported
+
+        with self.assertRaises(FeaturesNotSupported) as cm:
+            validator(self.source, features=self.features, collect=True)
+        self.assertEqual(len(cm.exception.errors), 4)
+        self.assertEqual(cm.exception.lineno, 1)
+
+        with self.assertRaises(FeatureNotSupported) as cm:
+            validator(self.source, features=self.features)
+        self.assertFalse(isinstance(cm.exception, FeaturesNotSupported))
+
+tests.append(TestCollect)
@@ -0,0 +1,56 @@
+import unittest
+
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestConforms(unittest.TestCase):
+
+    sources = [
+        'x = 1 + 2\n',
+        'f = lambda x: x\n',
+        'def f():\n    yield [x for x in y]\n',
+        'class A(B, C):\n    pass\n',
+        'import os\nfrom sys import *\n',
+    ]
+
+    def test_agrees_with_checker(self):
+        from subpy import conforms, checker, FullPython
+
+        subsets = [
+            FullPython,
+            FullPython - set([f.Lambda]),
+            FullPython - set([f.Generators, f.ListComp]),
+            FullPython - set([f.MInheritance]),
+            FullPython - set([f.ImportStar]),
+            set(),
+        ]
+        for source in self.sources:
+            for features in subsets:
+                self.assertEqual(conforms(source, features),
+                                 not checker(source, features), source)
+
+    def test_libraries(self):
+        from subpy import conforms, FullPython
+
+        self.assertTrue(conforms('import os.path\n', FullPython, ['os']))
+        self.assertFalse(conforms('import socket\n', FullPython, ['os']))
+
+    def test_prefilter(self):
+        from unittest import mock
+        from subpy import conforms, FullPython
+
+        source = 'x = [1, 2, 3]\n'
+        with mock.patch('subpy.validate.Conforms', side_effect=AssertionError):
+            self.assertTrue(conforms(source, FullPython - set([f.Lambda, f.Classes])))
+
+    def test_invalid(self):
+        from subpy import conforms, FullPython
+
+        for features in [FullPython, FullPython - set([f.Lambda])]:
+            self.assertRaises(SyntaxError, conforms, 'x = (', features)
+            self.assertRaises(SyntaxError, conforms, 'f = lambda: (', features)
+
+tests.append(TestConforms)
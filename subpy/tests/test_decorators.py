@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from subpy import subset, FeatureNotSupported, LibraryNotSupported, \
+    FullPython, ResultCache
+from subpy import decorators
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+numeric = FullPython - set([f.Lambda, f.ListComp, f.Decorators])
+
+class TestSubset(unittest.TestCase):
+
+    def setUp(self):
+        decorators.verdicts.clear()
+
+    def define(self):
+        def fn(x):
+            return [y for y in x]
+        return fn
+
+    def test_conforming(self):
+        def fn(x):
+            return x + 1
+
+        self.assertTrue(subset(numeric)(fn) is fn)
+
+    def test_decorator_syntax(self):
+        # The decorator lines aren't part of the function checked
+        @subset(set([f.Classes]))
+        def fn(x):
+            return x + 1
+
+        @subset(numeric)
+        @subset(FullPython)
+        def fn(x):
+            return x + 1
+
+        with self.assertRaises(FeatureNotSupported) as cm:
+            @subset(numeric)
+            def fn(x):
+                return [y for y in x]
+        self.assertEqual((cm.exception.msg, cm.exception.lineno), (f.ListComp, 3))
+
+    def test_violation(self):
+        with self.assertRaises(FeatureNotSupported) as cm:
+            subset(numeric)(self.define())
+        self.assertEqual((cm.exception.msg, cm.exception.lineno), (f.ListComp, 2))
+
+    def test_memoized(self):
+        check = subset(FullPython)
+        with mock.patch('subpy.decorators.verdict', return_value=()) as m:
+            check(self.define())
+            check(self.define())
+            subset(FullPython)(self.define())
+            subset(numeric)(self.define())
+        self.assertEqual(m.call_count, 2)
+
+    def test_keyed_on_code(self):
+        def f1(x):
+            return x + 1
+        def f2(x):
+            return x + 2.0
+        def f3(x=1):
+            return x + 1
+
+        mask, libs = 0, []
+        key = decorators.code_key
+        self.assertEqual(key(self.define(), mask, libs),
+                         key(self.define(), mask, libs))
+        self.assertNotEqual(key(f1, mask, libs), key(f2, mask, libs))
+        self.assertNotEqual(key(f1, mask, libs), key(f3, mask, libs))
+        self.assertNotEqual(key(f1, mask, libs), key(f1, 1, libs))
+
+    def test_without_source(self):
+        namespace = {}
+        exec('def fn(xs):\n    import socket\n    return [x for x in xs]\n', namespace)
+        fn = namespace['fn']
+
+        with self.assertRaises(FeatureNotSupported) as cm:
+            subset(numeric)(fn)
+        self.assertEqual((cm.exception.msg, cm.exception.lineno), (f.ListComp, 3))
+
+        self.assertRaises(LibraryNotSupported, subset(FullPython, ['math']), fn)
+        self.assertTrue(subset(FullPython)(fn) is fn)
+
+    def test_persistent(self):
+        root = tempfile.mkdtemp()
+        try:
+            cache = ResultCache(os.path.join(root, 'verdicts.db'))
+            self.assertRaises(FeatureNotSupported, subset(numeric, cache=cache),
+                              self.define())
+
+            decorators.verdicts.clear()
+            with mock.patch('subpy.decorators.verdict') as m:
+                self.assertRaises(FeatureNotSupported, subset(numeric, cache=cache),
+                                  self.define())
+            self.assertEqual(m.call_count, 0)
+            cache.close()
+        finally:
+            shutil.rmtree(root)
+
+tests.append(TestSubset)
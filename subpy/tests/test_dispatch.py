@@ -0,0 +1,64 @@
+import sys
+import unittest
+
+from subpy import detect
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestDispatch(unittest.TestCase):
+
+    def test_featuremask(self):
+        from subpy.validate import featuremask
+
+        self.assertEqual(featuremask([]), 0)
+        self.assertEqual(featuremask([f.Lambda, f.Classes]),
+                         (1 << f.Lambda) | (1 << f.Classes))
+
+    def test_enabled_checks(self):
+        import ast
+        from subpy.validate import compile_dispatch, featuremask, FullPython
+
+        dispatch = compile_dispatch(featuremask(FullPython))
+        self.assertTrue(all(not checks for checks, _, _ in dispatch.values()))
+
+        dispatch = compile_dispatch(featuremask(FullPython - set([f.Lambda])))
+        self.assertEqual(len(dispatch[ast.Lambda][0]), 1)
+        self.assertEqual(dispatch[ast.ListComp][0], ())
+
+    def test_subset_matches_detect(self):
+        from subpy import checker, FullPython
+
+        def fn():
+            xs = [lambda x: x for x in range(10)]
+            del xs
+
+        allowed = FullPython - set([f.Lambda, f.DelVar])
+        expected = dict((k, v) for k, v in detect(fn).items()
+                        if k not in allowed)
+        self.assertEqual(checker(fn, features=allowed), expected)
+
+    def test_deep_nesting(self):
+        from subpy import checker
+
+        depth = sys.getrecursionlimit() * 2
+        source = 'x = ' + '-' * depth + '(lambda: 1)'
+        self.assertEqual(checker(source), {f.Lambda: [1]})
+
+    def test_scope(self):
+        from subpy import checker
+
+        def fn():
+            def f():
+                class A:
+                    def method(self):
+                        def g():
+                            pass
+                def h():
+                    pass
+
+        self.assertEqual(checker(fn)[f.Closures], [2, 5, 7])
+
+tests.append(TestDispatch)
@@ -353,6 +353,84 @@ tests.append(TestFeatureDetect)
 
 #------------------------------------------------------------------------
 
+class TestModernSyntax(unittest.TestCase):
+
+    def test_async(self):
+        source = (
+            'async def f(xs):\n'
+            '    async with lock:\n'
+            '        await g()\n'
+            '    async for x in xs:\n'
+            '        pass\n'
+            '    return [y async for y in xs]\n'
+        )
+        self.assertEqual(detect(source)[f.AsyncAwait], [1, 2, 3, 4, 6])
+
+    def test_fstrings(self):
+        self.assertEqual(detect('x = f"{a!r}"')[f.FStrings], [1])
+        self.assertEqual(detect('x = f"{a:>{(lambda: 1)()}}"')[f.Lambda], [1])
+        self.assertFalse(f.FStrings in detect('x = "{a}"'))
+
+    def test_namedexpr(self):
+        self.assertEqual(detect('if (n := len(a)) > 10:\n    pass')[f.NamedExpr], [1])
+
+    def test_pattern_matching(self):
+        if sys.version_info < (3, 10):
+            return
+        source = (
+            'match command:\n'
+            '    case [Point(x=0, y=0), *rest] if rest:\n'
+            '        lambda: 0\n'
+            '    case {"k": v, **kw} | None:\n'
+            '        pass\n'
+        )
+        features = detect(source)
+        self.assertEqual(features[f.PatternMatching], [1])
+        self.assertEqual(features[f.Lambda], [3])
+
+    def test_descends(self):
+        # Default values, annotations and exception types are checked
+        source = (
+            'def f(x: [y for y in z] = lambda: 0, *, k=1) -> {a: b for a in c}:\n'
+            '    try:\n'
+            '        pass\n'
+            '    except (lambda: E)():\n'
+            '        pass\n'
+        )
+        features = detect(source)
+        self.assertEqual(features[f.Lambda], [1, 4])
+        self.assertEqual(features[f.ListComp], [1])
+        self.assertEqual(features[f.DictComp], [1])
+        self.assertTrue(f.KeywordArgs in detect('def f(*, k=1): pass'))
+
+    def test_relative_imports(self):
+        from subpy import checker
+
+        self.assertEqual(checker('from .mod import x', libraries=['os']),
+                         {f.RelativeImports: [1]})
+
+    def test_dispatch_complete(self):
+        import ast
+        from subpy.validate import compile_dispatch
+
+        def subclasses(cls):
+            for sub in cls.__subclasses__():
+                yield sub
+                for s in subclasses(sub):
+                    yield s
+
+        dispatch = compile_dispatch(0)
+        # Deprecated aliases of Constant never appear in parsed trees
+        aliases = set(['Num', 'Str', 'Bytes', 'NameConstant', 'Ellipsis'])
+        missing = [cls.__name__ for cls in subclasses(ast.AST)
+                   if cls._fields and cls not in dispatch
+                   and cls.__name__ not in aliases]
+        self.assertEqual(missing, [])
+
+tests.append(TestModernSyntax)
+
+#------------------------------------------------------------------------
+
 class TestStandardLibrary(unittest.TestCase):
 
     def test_fullstdlib(self):
@@ -417,9 +495,21 @@ tests.append(TestToplevel)
 
 #------------------------------------------------------------------------
 
+def alltests():
+    # The ``tests`` of every test module in the package
+    import pkgutil
+    import subpy.tests
+
+    found = []
+    for _, name, _ in pkgutil.iter_modules(subpy.tests.__path__):
+        if name.startswith('test_'):
+            mod = importlib.import_module('subpy.tests.' + name)
+            found.extend(mod.tests)
+    return found
+
 def run(verbosity=1, repeat=1):
     suite = unittest.TestSuite()
-    for cls in tests:
+    for cls in alltests():
         for _ in range(repeat):
             suite.addTest(unittest.makeSuite(cls))
 
@@ -0,0 +1,75 @@
+import os
+
+from subpy import check_imports
+from subpy import features as f
+from subpy.tests.support import TreeTestCase
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestImportGraph(TreeTestCase):
+
+    files = {
+        'main.py': 'import pkg.a\nfrom pkg import b\nimport os\n',
+        'pkg/__init__.py': '',
+        'pkg/a.py': 'from . import c\nxs = [x for x in y]\n',
+        'pkg/b.py': 'from .c import z\nimport socket\n',
+        'pkg/c.py': 'f = lambda: 0\nimport pkg.a\nfrom .broken import *\n',
+        'pkg/broken.py': 'def (\n',
+    }
+
+    def check(self, workers):
+        entry = self.path('main.py')
+        return check_imports(entry, libraries=['os'], workers=workers)
+
+    def test_graph(self):
+        graph = self.check(1)
+
+        self.assertEqual(sorted(graph.paths),
+                         ['main', 'pkg', 'pkg.a', 'pkg.b', 'pkg.broken', 'pkg.c'])
+        self.assertEqual(graph.edges['main'], ['pkg', 'pkg.a', 'pkg.b'])
+        self.assertEqual(graph.edges['pkg.c'], ['pkg', 'pkg.a', 'pkg.broken'])
+        self.assertEqual(sorted(graph.errors), ['pkg.broken'])
+        self.assertEqual(graph.chain('pkg.broken'), ['main', 'pkg.a', 'pkg.c', 'pkg.broken'])
+
+    def test_violations(self):
+        graph = self.check(1)
+
+        self.assertEqual(list(graph.violations()), [
+            (['main', 'pkg.a'], f.RelativeImports, [1]),
+            (['main', 'pkg.a'], f.ListComp, [2]),
+            (['main', 'pkg.b'], f.RelativeImports, [1]),
+            (['main', 'pkg.b'], 'socket', [2]),
+            (['main', 'pkg.a', 'pkg.c'], f.Lambda, [1]),
+            (['main', 'pkg.a', 'pkg.c'], f.RelativeImports, [3]),
+            (['main', 'pkg.a', 'pkg.c'], f.ImportStar, [3]),
+        ])
+
+    def test_single_pass(self):
+        # Every chain comes from one walk over the graph
+        graph = self.check(1)
+        walks = []
+        parents = graph.parents
+        def counted():
+            walks.append(1)
+            return parents()
+        graph.parents = counted
+
+        self.assertEqual(len(list(graph.violations())), 7)
+        self.assertEqual(len(walks), 1)
+
+    def test_parallel(self):
+        serial, parallel = self.check(1), self.check(2)
+
+        self.assertEqual(parallel.results, serial.results)
+        self.assertEqual(parallel.edges, serial.edges)
+        self.assertEqual(list(parallel.violations()), list(serial.violations()))
+
+    def test_module_name(self):
+        graph = check_imports('pkg.b', roots=[self.root], workers=1)
+        self.assertEqual(sorted(graph.paths), ['pkg', 'pkg.a', 'pkg.b',
+                                               'pkg.broken', 'pkg.c'])
+        self.assertRaises(ValueError, check_imports, 'nope', roots=[self.root])
+
+tests.append(TestImportGraph)
@@ -0,0 +1,89 @@
+import sys
+import importlib
+from unittest import mock
+
+from subpy import FeatureNotSupported, LibraryNotSupported, FullPython, \
+    ResultCache
+from subpy import hook
+from subpy import features as f
+from subpy.tests.support import TreeTestCase
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestImportHook(TreeTestCase):
+
+    modules = {
+        'plugin_ok': 'import math\ndef f(x):\n    return x + 1\n',
+        'plugin_lambda': 'import math\n\nf = lambda x: x\n',
+        'plugin_socket': 'import socket\n',
+    }
+    files = dict(('plugins/%s.py' % name, source)
+                 for name, source in modules.items())
+
+    def setUp(self):
+        super(TestImportHook, self).setUp()
+        self.plugins = self.path('plugins')
+        sys.path.insert(0, self.plugins)
+        self.cache = ResultCache(self.path('verdicts.db'))
+        self.finder = self.install()
+
+    def tearDown(self):
+        self.finder.uninstall()
+        self.cache.close()
+        sys.path.remove(self.plugins)
+        for name in self.modules:
+            sys.modules.pop(name, None)
+        super(TestImportHook, self).tearDown()
+
+    def install(self):
+        return hook.install([self.plugins], FullPython - set([f.Lambda]),
+                            ['math'], cache=self.cache)
+
+    def test_conforming(self):
+        mod = importlib.import_module('plugin_ok')
+        self.assertEqual(mod.f(1), 2)
+        self.assertTrue(isinstance(mod.__spec__.loader, hook.ValidatingLoader))
+
+    def test_violation(self):
+        with self.assertRaises(FeatureNotSupported) as cm:
+            importlib.import_module('plugin_lambda')
+        e = cm.exception
+        self.assertEqual((e.msg, e.lineno, e.text), (f.Lambda, 3, 'f = lambda x: x'))
+        self.assertTrue(e.filename.endswith('plugin_lambda.py'))
+        self.assertFalse('plugin_lambda' in sys.modules)
+
+        self.assertRaises(LibraryNotSupported, importlib.import_module,
+                          'plugin_socket')
+
+    def test_outside_paths(self):
+        # Modules outside the directories are left to the usual finders
+        self.assertEqual(self.finder.find_spec('json'), None)
+
+    def test_parse_once(self):
+        import ast
+        parse = ast.parse
+        with mock.patch('ast.parse', side_effect=parse) as m:
+            importlib.import_module('plugin_ok')
+        self.assertEqual(m.call_count, 1)
+
+    def test_warm_start(self):
+        importlib.import_module('plugin_ok')
+        self.assertRaises(FeatureNotSupported, importlib.import_module,
+                          'plugin_lambda')
+
+        # A new process: nothing in memory, verdicts and .pyc on disk
+        self.finder.uninstall()
+        self.finder = self.install()
+        for name in self.modules:
+            sys.modules.pop(name, None)
+
+        with mock.patch('subpy.hook.parse') as m:
+            importlib.import_module('plugin_ok')
+            with self.assertRaises(FeatureNotSupported) as cm:
+                importlib.import_module('plugin_lambda')
+        self.assertEqual(m.call_count, 0)
+        self.assertEqual(cm.exception.lineno, 3)
+
+tests.append(TestImportHook)
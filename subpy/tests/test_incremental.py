@@ -0,0 +1,67 @@
+import unittest
+
+from subpy import checker
+from subpy.incremental import IncrementalChecker
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestIncremental(unittest.TestCase):
+
+    source = '\n'.join([
+        'import os',
+        '',
+        'def f(xs):',
+        '    return [x for x in xs]',
+        '',
+        '@decorator',
+        'def g():',
+        '    h = lambda: 1',
+        '',
+        'class A(B, C):',
+        '    pass',
+        '',
+    ])
+
+    def edits(self):
+        lines = self.source.splitlines(True)
+        yield self.source
+        # Edit inside a function
+        lines[3] = '    return {x for x in xs}\n'
+        yield ''.join(lines)
+        # Insert lines above, shifting everything after
+        lines[1:1] = ['x = 1; y = lambda: 2\n', '\n']
+        yield ''.join(lines)
+        # Open a string that swallows the rest of the module
+        yield ''.join(lines[:6] + ['    """\n'] + lines[6:] + ['"""\n'])
+        # Delete the class
+        yield ''.join(lines[:-3])
+
+    def test_matches_checker(self):
+        c = IncrementalChecker()
+        for source in self.edits():
+            self.assertEqual(c(source), checker(source))
+
+    def test_walks_changed_blocks(self):
+        c = IncrementalChecker()
+        walked = []
+        check = c.checker
+        c.checker = lambda stmt: walked.append(stmt.lineno) or check(stmt)
+
+        edits = self.edits()
+        c(next(edits))
+        self.assertEqual(walked, [1, 3, 7, 10])
+
+        del walked[:]
+        c(next(edits))
+        self.assertEqual(walked, [3])
+
+    def test_syntax_error(self):
+        c = IncrementalChecker()
+        c(self.source)
+        with self.assertRaises(SyntaxError):
+            c(self.source.replace('pass', 'pass ('))
+        self.assertEqual(c(self.source), checker(self.source))
+
+tests.append(TestIncremental)
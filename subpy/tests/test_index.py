@@ -0,0 +1,97 @@
+import os
+from unittest import mock
+
+from subpy import FeatureIndex, validate
+from subpy import features as f
+from subpy.tests.support import TreeTestCase
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestFeatureIndex(TreeTestCase):
+
+    files = {
+        'meta.py': 'class A(B, C, metaclass=M):\n    pass\n',
+        'lam.py': 'f = lambda x: x\nxs = [x for x in y]\n',
+        'plain.py': 'x = 1\n',
+    }
+
+    def setUp(self):
+        super(TestFeatureIndex, self).setUp()
+        self.db = self.path('index.db')
+        self.index = FeatureIndex(self.db)
+        self.index.update([self.root], workers=1)
+
+    def tearDown(self):
+        self.index.close()
+        super(TestFeatureIndex, self).tearDown()
+
+    def test_query(self):
+        self.assertEqual(self.index.query('MInheritance'), [self.path('meta.py')])
+        self.assertEqual(self.index.query(f.Lambda), [self.path('lam.py')])
+        self.assertEqual(self.index.query('Lambda | Classes'),
+                         [self.path('lam.py'), self.path('meta.py')])
+        self.assertEqual(self.index.query('Lambda and ListComp'),
+                         [self.path('lam.py')])
+        self.assertEqual(self.index.query('~Lambda & ~Classes'),
+                         [self.path('plain.py')])
+        self.assertEqual(self.index.query('not (Lambda or Classes)'),
+                         [self.path('plain.py')])
+        self.assertEqual(self.index.features(self.path('lam.py')),
+                         set([f.Lambda, f.ListComp]))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, self.index.query, 'NoSuchFeature')
+        self.assertRaises(ValueError, self.index.query, 'Lambda +')
+        self.assertRaises(ValueError, self.index.query, 'Lambda * Classes')
+
+    def test_persistent(self):
+        self.index.close()
+        self.index = FeatureIndex(self.db)
+
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.query('MInheritance'), [self.path('meta.py')])
+        self.assertEqual(self.index.update([self.root], workers=1), 0)
+
+    def test_incremental(self):
+        self.write('plain.py', 'x = 1\nf = lambda: 0\n')
+        os.remove(self.path('meta.py'))
+        self.write('bad.py', 'def (\n')
+
+        self.assertEqual(self.index.update([self.root], workers=1), 1)
+        self.assertEqual(self.index.query('Lambda'),
+                         [self.path('lam.py'), self.path('plain.py')])
+        self.assertEqual(self.index.query('Classes'), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_broken(self):
+        # A file that doesn't parse isn't read again until it changes,
+        # including once the index is reopened
+        self.write('bad.py', 'def (\n')
+        self.assertEqual(self.index.update([self.root], workers=1), 0)
+
+        scanned = []
+        def scan_paths(paths, **kwargs):
+            scanned.extend(paths)
+            return validate.scan_paths(paths, **kwargs)
+
+        with mock.patch('subpy.index.scan_paths', scan_paths):
+            self.assertEqual(self.index.update([self.root], workers=1), 0)
+            self.index.close()
+            self.index = FeatureIndex(self.db)
+            self.assertEqual(self.index.update([self.root], workers=1), 0)
+        self.assertEqual(scanned, [])
+        self.assertNotIn(self.path('bad.py'), self.index)
+        self.assertEqual(self.index.query('~Lambda'),
+                         [self.path('meta.py'), self.path('plain.py')])
+
+        self.write('bad.py', 'f = lambda: 0\n')
+        self.assertEqual(self.index.update([self.root], workers=1), 1)
+        self.assertIn(self.path('bad.py'), self.index.query('Lambda'))
+
+        os.remove(self.path('bad.py'))
+        self.index.update([self.root], workers=1)
+        self.assertEqual(len(self.index), 3)
+
+tests.append(TestFeatureIndex)
@@ -0,0 +1,36 @@
+import unittest
+
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestLibraries(unittest.TestCase):
+
+    def test_matcher(self):
+        from subpy.validate import LibraryMatcher
+
+        matcher = LibraryMatcher(['os', 'numpy.*', 'a.b', 'x*.y'])
+        for name in ['os', 'os.path', 'numpy.linalg', 'a.b', 'a.b.c', 'xz.y']:
+            self.assertTrue(matcher(name), name)
+        for name in ['osx', 'numpy', 'a', 'a.bc', 'xz.yz', 'sys']:
+            self.assertFalse(matcher(name), name)
+
+    def test_shared(self):
+        from subpy.validate import Checker
+
+        a = Checker(set(), ['os', 'sys'])
+        b = Checker(set(), ['os', 'sys'])
+        self.assertTrue(a.libs is b.libs)
+
+    def test_collect(self):
+        from subpy import LibraryNotSupported
+        from subpy.validate import Checker
+
+        source = 'import socket\nxs = [x for x in y]\nfrom ctypes import c_int\n'
+        self.assertRaises(LibraryNotSupported, Checker(set(), ['os']), source)
+        self.assertEqual(Checker(set(), ['os'], collect=True)(source),
+                         {f.ListComp: [2], None: [('socket', 1), ('ctypes.c_int', 3)]})
+
+tests.append(TestLibraries)
@@ -0,0 +1,75 @@
+import sys
+import unittest
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestLimits(unittest.TestCase):
+
+    def test_max_bytes(self):
+        from subpy import checker, Limits, LimitExceeded
+
+        limits = Limits(max_bytes=10)
+        self.assertEqual(checker('x = 1\n', limits=limits), {})
+        self.assertRaises(LimitExceeded, checker, 'x = 1\n' * 3, limits=limits)
+        self.assertRaises(LimitExceeded, checker, "x = '\u00e9\u00e9\u00e9'", limits=limits)
+
+    def test_max_nodes(self):
+        from subpy import validator, Limits, LimitExceeded
+
+        with self.assertRaises(LimitExceeded) as cm:
+            validator('x = 1\n' * 100, limits=Limits(max_nodes=50))
+        self.assertEqual(cm.exception.msg, 'max_nodes')
+        self.assertEqual(cm.exception.lineno, 17)
+
+    def test_max_depth(self):
+        from subpy import checker, Limits, LimitExceeded
+
+        source = 'x = ' + '[' * 20 + ']' * 20
+        self.assertEqual(checker(source, limits=Limits(max_depth=30)), {})
+        with self.assertRaises(LimitExceeded) as cm:
+            checker(source, limits=Limits(max_depth=10))
+        self.assertEqual(cm.exception.msg, 'max_depth')
+
+    def test_unpositioned(self):
+        import ast
+        from subpy import checker, Limits, LimitExceeded
+
+        # Limits reached at nodes without a position are reported at
+        # the nearest node with one, or without a position at all
+        cases = [
+            ('def f():\n    pass\n', Limits(max_nodes=2), 'max_nodes', 1),
+            ('with a as b:\n    pass\n', Limits(max_depth=1), 'max_depth', 1),
+            ('x = [y for y in z]\n', Limits(max_depth=2), 'max_depth', 1),
+            (ast.parse('x = 1'), Limits(max_nodes=0), 'max_nodes', None),
+        ]
+        if sys.version_info >= (3, 10):
+            cases.append(('match x:\n    case 1:\n        pass\n',
+                          Limits(max_depth=1), 'max_depth', 1))
+        for source, limits, name, lineno in cases:
+            with self.assertRaises(LimitExceeded) as cm:
+                checker(source, limits=limits)
+            self.assertEqual((cm.exception.msg, cm.exception.lineno), (name, lineno))
+
+    def test_zero(self):
+        from subpy import checker, Limits, LimitExceeded
+
+        self.assertRaises(LimitExceeded, checker, 'x = 1', limits=Limits(max_nodes=0))
+        self.assertRaises(LimitExceeded, checker, 'x = 1', limits=Limits(max_depth=0))
+        self.assertRaises(LimitExceeded, checker, 'x = 1', limits=Limits(timeout=0))
+
+    def test_parser(self):
+        from subpy import checker, LimitExceeded
+
+        self.assertRaises(LimitExceeded, checker, 'x = ' + '-' * 100000 + '1')
+
+    def test_timeout(self):
+        from subpy import checker, Limits, LimitExceeded
+
+        source = 'x = f(1)\n' * 20000
+        with self.assertRaises(LimitExceeded) as cm:
+            checker(source, limits=Limits(timeout=1e-6))
+        self.assertEqual(cm.exception.msg, 'timeout')
+
+tests.append(TestLimits)
@@ -0,0 +1,38 @@
+import unittest
+
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestLineIndex(unittest.TestCase):
+
+    source = "a = 1\r\nb = 'caf\u00e9' + [x for x in y]\rc\n\nd"
+
+    def test_lines(self):
+        from subpy import LineIndex
+
+        lines = LineIndex(self.source)
+        self.assertEqual(len(lines), 5)
+        self.assertEqual([lines.line(i) for i in range(1, 6)],
+                         self.source.splitlines())
+
+    def test_snippet(self):
+        import ast
+        from subpy import LineIndex
+
+        lines = LineIndex(self.source)
+        node = ast.parse(self.source).body[1].value.right
+        self.assertEqual(lines.snippet(node), '[x for x in y]')
+
+    def test_validator_line(self):
+        from subpy import validator, FullPython, FeatureNotSupported
+
+        source = 'x = 1\n\ny = [a for a in x]\n'
+        with self.assertRaises(FeatureNotSupported) as cm:
+            validator(source, features=FullPython - set([f.ListComp]))
+        self.assertEqual(cm.exception.text, 'y = [a for a in x]')
+        self.assertEqual(cm.exception.offset, 5)
+
+tests.append(TestLineIndex)
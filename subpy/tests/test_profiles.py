@@ -0,0 +1,45 @@
+import unittest
+
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestProfiles(unittest.TestCase):
+
+    source = '\n'.join([
+        'def f(*args):',
+        '    g = lambda x: x',
+        '    return [x for x in args]',
+        'class A(B, C):',
+        '    pass',
+    ])
+
+    def test_tree(self):
+        import ast
+        from subpy import checker, validator, FullPython, FeatureNotSupported
+
+        tree = ast.parse(self.source)
+        self.assertEqual(checker(tree), checker(self.source))
+
+        with self.assertRaises(FeatureNotSupported) as cm:
+            validator(tree, features=FullPython - set([f.Lambda]))
+        self.assertEqual((cm.exception.lineno, cm.exception.text), (2, None))
+
+    def test_profiles(self):
+        from subpy import check_profiles, checker, FullPython
+
+        profiles = {
+            'gpu': FullPython - set([f.Classes, f.Lambda, f.VarArgs]),
+            'jit': FullPython - set([f.MInheritance, f.ListComp]),
+            'sandbox': FullPython,
+            'none': set(),
+        }
+
+        results = check_profiles(self.source, profiles)
+        self.assertEqual(sorted(results), sorted(profiles))
+        for name, features in profiles.items():
+            self.assertEqual(results[name], checker(self.source, features))
+
+tests.append(TestProfiles)
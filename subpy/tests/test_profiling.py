@@ -0,0 +1,70 @@
+import os
+import ast
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from subpy import Checker, Validator, checker
+from subpy.profiling import Profile
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestProfile(unittest.TestCase):
+
+    source = 'xs = [x for x in range(10)]\nf = lambda x: g(x)\n'
+
+    def setUp(self):
+        self.profile = Profile()
+        self.check = self.profile.attach(Checker(set(), []))
+
+    def test_counts(self):
+        self.assertEqual(self.check(self.source), checker(self.source))
+        self.check(ast.parse(self.source))
+
+        stats = self.profile.to_dict()
+        self.assertEqual(stats['nodes']['visit_ListComp']['calls'], 2)
+        self.assertEqual(stats['nodes']['visit_Call']['calls'], 4)
+        self.assertEqual(stats['checks']['lambda_lambda']['calls'], 2)
+        self.assertEqual(stats['checks']['call_varargs']['calls'], 4)
+
+        self.assertEqual(len(stats['sources']), 2)
+        self.assertTrue(stats['sources'][0]['parse'] > 0)
+        self.assertEqual(stats['sources'][1]['parse'], 0.0)
+        self.assertTrue(all(s['walk'] > 0 for s in stats['sources']))
+
+    def test_detach(self):
+        self.profile.detach(self.check)
+        self.check(self.source)
+
+        self.assertEqual(self.profile.sources, [])
+        self.assertEqual(self.check(self.source), checker(self.source))
+        self.assertFalse('visit' in self.check.__dict__)
+
+    def test_errors(self):
+        from subpy import FeatureNotSupported, FullPython
+        from subpy import features as f
+
+        v = self.profile.attach(Validator(FullPython - set([f.Lambda]), []))
+        self.assertRaises(FeatureNotSupported, v, self.source)
+        self.assertRaises(SyntaxError, v, 'def (')
+        self.assertEqual(len(self.profile.sources), 2)
+
+    def test_pstats(self):
+        self.check(self.source)
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, 'subpy.prof')
+            self.profile.dump(path)
+            stats = pstats.Stats(path).stats
+        finally:
+            shutil.rmtree(root)
+
+        self.assertEqual(stats[('~', 0, 'visit_Lambda')][:2], (1, 1))
+        lambdas = [v for k, v in stats.items() if k[2] == 'lambda_lambda']
+        self.assertEqual(len(lambdas), 1)
+        self.assertTrue(('~', 0, 'visit_Lambda') in lambdas[0][4])
+
+tests.append(TestProfile)
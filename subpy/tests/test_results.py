@@ -0,0 +1,59 @@
+import unittest
+
+from subpy import checker, FullPython
+from subpy import features as f
+from subpy.results import Results
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestResults(unittest.TestCase):
+
+    sources = [
+        ('a.py', 'xs = [x for x in y]\nclass A(B, C):\n    pass\n'),
+        ('b.py', 'f = lambda: 1\n'),
+        ('c.py', 'class Q:\n    __metaclass__ = M\n'),
+    ]
+
+    def build(self, sources, features=None):
+        results = Results()
+        for name, source in sources:
+            results.add(name, source, features)
+        return results
+
+    def test_to_dict(self):
+        features = FullPython - set([f.Classes, f.ListComp])
+        results = self.build(self.sources, features)
+
+        self.assertEqual(results.to_dicts(), dict(
+            (name, checker(source, features)) for name, source in self.sources))
+
+    def test_columns(self):
+        results = self.build(self.sources[:1])
+        self.assertEqual(list(results.file), [0] * 4)
+        self.assertEqual(list(results.feature),
+                         [f.ListComp, f.Classes, f.Inheritance, f.MInheritance])
+        self.assertEqual(list(results.line), [1, 2, 2, 2])
+        self.assertEqual(list(results.col), [5, 0, 0, 0])
+
+    def test_extend(self):
+        results = self.build(self.sources[:2])
+        results.extend(self.build(self.sources[2:]))
+        results.add_result('d.py', {f.Metaclasses: [3, 4]})
+
+        self.assertEqual(results.files, ['a.py', 'b.py', 'c.py', 'd.py'])
+        self.assertEqual(results.using(f.Classes), ['a.py', 'c.py'])
+        self.assertEqual(results.using(f.Metaclasses), ['c.py', 'd.py'])
+        self.assertEqual(results.to_dict(3), {f.Metaclasses: [3, 4]})
+
+    def test_rollback(self):
+        results = self.build(self.sources[:1])
+        with self.assertRaises(SyntaxError):
+            results.add('bad.py', 'xs = [x for x in y]\nimport socket\n',
+                        libraries=['os'])
+
+        self.assertEqual(len(results.files), 1)
+        self.assertEqual(len(results), 4)
+
+tests.append(TestResults)
@@ -0,0 +1,38 @@
+import unittest
+
+from subpy import features as f
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestReuse(unittest.TestCase):
+
+    sources = [
+        'def f():\n    def g():\n        pass\n',
+        'f = lambda x: x\n',
+        'class A(B):\n    pass\n',
+    ]
+
+    def test_check_many(self):
+        from subpy import check_many, checker, FullPython
+
+        features = FullPython - set([f.Closures, f.Lambda])
+        results = check_many(iter(self.sources), features)
+        self.assertEqual(list(results),
+                         [checker(source, features) for source in self.sources])
+
+    def test_prepared(self):
+        from subpy import Checker, Validator, FullPython, FeatureNotSupported
+
+        check = Checker(FullPython - set([f.Classes]), [])
+        self.assertEqual([check(source) for source in self.sources * 2],
+                         [{}, {}, {f.Classes: [1]}] * 2)
+
+        validate = Validator(FullPython - set([f.Closures]), [])
+        for _ in range(2):
+            with self.assertRaises(FeatureNotSupported):
+                validate(self.sources[0])
+            validate(self.sources[1])
+
+tests.append(TestReuse)
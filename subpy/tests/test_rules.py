@@ -0,0 +1,141 @@
+import shutil
+import tempfile
+import unittest
+
+from subpy import detect
+from subpy import features as f
+from subpy.tests.support import write_tree
+
+tests = []
+
+#------------------------------------------------------------------------
+
+# Rule predicates are module level so spawned workers can import them
+
+def call_eval(node):
+    import ast
+    return isinstance(node.func, ast.Name) and node.func.id == 'eval'
+
+def attribute(node):
+    import ast
+    return isinstance(node, ast.Attribute) or isinstance(node.func, ast.Attribute)
+
+def name_late(node):
+    return node.id == 'late'
+
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        import ast
+        from subpy import register_feature, rule
+
+        self.Eval = register_feature('Eval')
+        self.Attributes = register_feature('Attributes')
+
+        rule('Call', self.Eval)(call_eval)
+        rule([ast.Attribute, 'Call'], self.Attributes)(attribute)
+
+    def tearDown(self):
+        from subpy import unregister_feature
+
+        unregister_feature(self.Eval)
+        unregister_feature(self.Attributes)
+
+    def test_register(self):
+        from subpy import register_feature, FullPython
+
+        self.assertTrue(self.Eval > f.PatternMatching)
+        self.assertEqual(register_feature('Eval'), self.Eval)
+        self.assertEqual(f.FeatureNames[self.Eval], 'Eval')
+        self.assertTrue(self.Eval in FullPython)
+        self.assertRaises(ValueError, register_feature, 'not a name')
+
+    def test_detect(self):
+        from subpy import checker
+
+        source = 'x = eval(s, k=1)\ny = x.real\n'
+        self.assertEqual(detect(source), {f.KeywordArgs: [1], self.Eval: [1],
+                                          self.Attributes: [2]})
+        self.assertEqual(checker(source, set([f.KeywordArgs, self.Attributes])),
+                         {self.Eval: [1]})
+
+    def test_validate(self):
+        from subpy import validator, FullPython, FeatureNotSupported
+
+        validator('eval(s)', FullPython)
+        with self.assertRaises(FeatureNotSupported) as cm:
+            validator('x = 1\neval(s)', FullPython - set([self.Eval]))
+        self.assertEqual(cm.exception.lineno, 2)
+
+    def test_dispatch(self):
+        import ast
+        from subpy.validate import compile_dispatch, featuremask
+
+        # Both rules on Call run from the one entry for Call, alongside
+        # the built-in checks, and neither when its feature is allowed
+        enabled = compile_dispatch(0)[ast.Call][0]
+        names = [getattr(fn, '__wrapped__', fn).__name__ for fn in enabled]
+        self.assertTrue('call_eval' in names and 'attribute' in names)
+        self.assertTrue('call_kwargs' in names)
+
+        enabled = compile_dispatch(featuremask([self.Eval]))[ast.Call][0]
+        names = [getattr(fn, '__wrapped__', fn).__name__ for fn in enabled]
+        self.assertFalse('call_eval' in names)
+
+    def test_errors(self):
+        from subpy import rule, unregister_feature
+
+        self.assertRaises(ValueError, rule, 'Nonsense', self.Eval)
+        for nodetype in ['arguments', 'comprehension', 'withitem', 'Module']:
+            self.assertRaises(ValueError, rule, nodetype, self.Eval)
+        self.assertRaises(ValueError, rule, 'Call', 1000)
+        self.assertRaises(ValueError, unregister_feature, f.Lambda)
+
+    def test_unregister(self):
+        from subpy import register_feature, unregister_feature
+
+        code = register_feature('Unused')
+        unregister_feature(code)
+        self.assertFalse(code in f.FeatureNames)
+        self.assertEqual(detect('eval(s)'), {self.Eval: [1]})
+
+    def test_spawned_workers(self):
+        import multiprocessing
+        from subpy.validate import worker_pool
+
+        # Workers that don't inherit the rules are sent them
+        context = multiprocessing.get_context('spawn')
+        with worker_pool(1, context) as pool:
+            self.assertEqual(pool.submit(detect, 'eval(s)').result(),
+                             {self.Eval: [1]})
+
+    def test_scan_workers(self):
+        from subpy import scan_paths
+
+        root = tempfile.mkdtemp()
+        try:
+            write_tree(root, {'a.py': 'eval(s)\n'})
+            found = list(scan_paths([root], workers=2))
+        finally:
+            shutil.rmtree(root)
+        self.assertEqual([r for p, r in found], [{self.Eval: [1]}])
+
+    def test_async_workers(self):
+        import asyncio
+        from subpy import aio, register_feature, unregister_feature, rule
+
+        # A worker started before a rule was registered still applies it
+        async def main():
+            async with aio.AsyncChecker(workers=1) as c:
+                await c.detect('x')
+                late = register_feature('Late')
+                rule('Name', late)(name_late)
+                try:
+                    return late, await c.detect('late')
+                finally:
+                    unregister_feature(late)
+
+        late, found = asyncio.run(main())
+        self.assertEqual(found, {late: [1]})
+
+tests.append(TestRules)
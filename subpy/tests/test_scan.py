@@ -0,0 +1,32 @@
+from subpy.tests.support import TreeTestCase
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestScan(TreeTestCase):
+
+    files = {
+        'a.py': 'xs = [x for x in range(10)]\n',
+        'b.py': 'f = lambda x: x\ng = lambda y: y\n',
+        'pkg/c.py': 'del x\n',
+        'pkg/notes.txt': 'not python',
+    }
+
+    def expected(self):
+        from subpy import checker
+        return [(self.path(name), checker(source))
+                for name, source in sorted(self.files.items())
+                if name.endswith('.py')]
+
+    def test_serial(self):
+        from subpy import scan_paths
+        results = list(scan_paths([self.root], workers=1))
+        self.assertEqual(results, self.expected())
+
+    def test_parallel(self):
+        from subpy import scan_paths
+        results = list(scan_paths([self.root], workers=2, chunksize=1))
+        self.assertEqual(results, self.expected())
+
+tests.append(TestScan)
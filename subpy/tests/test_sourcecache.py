@@ -0,0 +1,75 @@
+import os
+import sys
+import importlib
+
+from subpy import features as f
+from subpy.tests.support import TreeTestCase
+
+tests = []
+
+#------------------------------------------------------------------------
+
+class TestSourceCache(TreeTestCase):
+
+    module = '\n'.join([
+        'def f(xs):',
+        '    return [x for x in xs]',
+        '',
+        'class A(object):',
+        '    @staticmethod',
+        '    def g(*args):',
+        '        return lambda: args',
+        '',
+    ])
+    files = {'subpy_cached.py': module}
+
+    def setUp(self):
+        super(TestSourceCache, self).setUp()
+        self.file = self.path('subpy_cached.py')
+        sys.path.insert(0, self.root)
+        self.mod = importlib.import_module('subpy_cached')
+
+    def tearDown(self):
+        sys.path.remove(self.root)
+        sys.modules.pop('subpy_cached', None)
+        super(TestSourceCache, self).tearDown()
+
+    def test_parse_once(self):
+        import ast
+        from unittest import mock
+        from subpy import checker
+        from subpy.validate import getsource
+
+        fns = [self.mod, self.mod.f, self.mod.A.g]
+        expected = [checker(getsource(fn)) for fn in fns]
+
+        parse = ast.parse
+        with mock.patch('ast.parse', side_effect=parse) as m:
+            self.assertEqual([checker(fn) for fn in fns], expected)
+            self.assertEqual([checker(fn) for fn in fns], expected)
+        self.assertEqual(m.call_count, 1)
+
+    def test_columns(self):
+        from subpy import validator, FullPython, FeatureNotSupported
+
+        with self.assertRaises(FeatureNotSupported) as cm:
+            validator(self.mod.A.g, features=FullPython - set([f.Lambda]))
+        e = cm.exception
+        self.assertEqual((e.lineno, e.offset, e.text), (3, 12, '    return lambda: args'))
+
+    def test_modified(self):
+        from subpy import checker
+
+        self.assertEqual(checker(self.mod.f), {f.ListComp: [2]})
+
+        with open(self.file, 'w') as fd:
+            fd.write(self.module.replace('[x for x in xs]', '{x for x in xs}'))
+        st = os.stat(self.file)
+        os.utime(self.file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        self.assertEqual(checker(self.mod), {f.SetComp: [2], f.Classes: [4],
+                                             f.Inheritance: [4],
+                                             f.Decorators: [6], f.VarArgs: [6],
+                                             f.Lambda: [7]})
+
+tests.append(TestSourceCache)
@@ -1,9 +1,15 @@
+import os
 import re
 import ast
+import sys
+import time
 import types
 import inspect
+import functools
+import tokenize
 from textwrap import dedent
-from collections import deque, defaultdict
+from collections import deque, defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 from .features import *
 
@@ -41,575 +47,1145 @@ FullPython = set([
     SetComp,
     CustomIterators,
     Printing,
-    Metaclasses
+    Metaclasses,
+    AsyncAwait,
+    FStrings,
+    NamedExpr,
+    PatternMatching,
 ])
 
-def _compile_lib_matcher(libs):
-    matches = []
-    for allowed in libs:
-        matches.append(allowed.replace('.', '\\.')\
-                              .replace('*', '.*$'))
-    return r'|'.join(matches)
-
 #------------------------------------------------------------------------
-# AST Traversal
+# Libraries
 #------------------------------------------------------------------------
 
-GLOBAL = 0
-
-class PythonVisitor(ast.NodeVisitor):
-
-    def __init__(self, features, libs):
-        self.scope = deque([('global', 0)])
-        self.features = features
-
-        if libs:
-            self.libs = _compile_lib_matcher(libs)
-        else:
-            self.libs = None
-
-    def __call__(self, source):
-        if isinstance(source, types.ModuleType):
-            source = dedent(inspect.getsource(source))
-        if isinstance(source, types.FunctionType):
-            source = dedent(inspect.getsource(source))
-        if isinstance(source, types.LambdaType):
-            source = dedent(inspect.getsource(source))
-        elif isinstance(source, str):
-            source = source
+class LibraryMatcher(object):
+    """ Allow-list of dotted module names held as a trie of name
+    components. An entry ``a.b`` allows ``a.b`` and everything below it
+    while ``a.*`` allows only what is below ``a``. Entries with a
+    wildcard anywhere else are matched as glob patterns. """
+
+    def __init__(self, libs):
+        self.trie = {}
+        patterns = []
+
+        for allowed in libs:
+            head, _, last = allowed.rpartition('.')
+            if '*' in head or ('*' in last and last != '*'):
+                patterns.append(re.escape(allowed).replace('\\*', '.*'))
+                continue
+
+            node = self.trie
+            for part in allowed.split('.'):
+                node = node.setdefault(part, {})
+            if last != '*':
+                node[None] = True
+
+        if patterns:
+            self.pattern = re.compile(r'(?:%s)$' % r'|'.join(patterns))
         else:
-            raise NotImplementedError
-
-        self._source = source
-        self._ast = ast.parse(source)
-        self.visit(self._ast)
-
-    def nolib(self, node, library):
-        #print 'NO SUPPORT! %s' % library
-        #print self._source.split('\n')[node.lineno-1]
-        raise SystemExit()
-
-    def action(self, node, feature):
-        raise NotImplementedError
-
-    # -------------------------------------------------
-
-    def visit_comprehension(self, node):
-        if node.ifs:
-            ifs = list(map(self.visit, node.ifs))
-        target = self.visit(node.target)
-        iter = self.visit(node.iter)
-
-    def visit_keyword(self, node):
-        value = self.visit(node.value)
-
-    def check_arguments(self, node):
-        args = node.args
-
-        ### Check for variadic arguments
-        if VarArgs not in self.features:
-            if args.vararg:
-                self.action(node, VarArgs)
-
-        ### Check for keyword arguments
-        if KeywordArgs not in self.features:
-            if args.kwarg:
-                self.action(node, KeywordArgs)
-            if args.defaults:
-                self.action(node, KeywordArgs)
-
-    # -------------------------------------------------
-
-    def visit_Assert(self, node):
-        ## Check for assertions
-        if Assertions not in self.features:
-            self.action(node, Assertions)
-
-        test = self.visit(node.test)
-
-    def visit_Assign(self, node):
-        targets = node.targets
-
-        ## Check for tuple unpacking
-        if TupleUnpacking not in self.features:
-            if len(node.targets) > 1:
-                self.action(node, TupleUnpacking)
-
-            if any(isinstance(x, ast.Tuple) for x in node.targets):
-                self.action(node, TupleUnpacking)
-
-        for target in targets:
-            self.visit(target)
-            self.visit(node.value)
-
-            ## Check for metaclasses
-            if Metaclasses not in self.features:
-                if isinstance(target, ast.Name) and target.id == '__metaclass__':
-                    self.action(node, Metaclasses)
-
-    def visit_Attribute(self, node):
-        value = self.visit(node.value)
-
-    def visit_AugAssign(self, node):
-        target = self.visit(node.target)
-        value = self.visit(node.value)
-        op = node.op.__class__
-
-    def visit_BinOp(self, node):
-        lhs = self.visit(node.left)
-        rhs = self.visit(node.right)
-        op_str = node.op.__class__
+            self.pattern = None
+
+    def __call__(self, name):
+        node = self.trie
+        for part in name.split('.'):
+            if '*' in node:
+                return True
+            node = node.get(part)
+            if node is None:
+                break
+            if None in node:
+                return True
+
+        return self.pattern is not None and self.pattern.match(name) is not None
+
+_matcher_cache = {}
+
+def compile_libraries(libs):
+    """ Shared matcher for an allow-list, built once per distinct list. """
+    key = tuple(libs)
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        matcher = _matcher_cache[key] = LibraryMatcher(libs)
+    return matcher
 
-        ## Check for implicit coercions between numeric types
-        if ImplicitCasts not in self.features:
-            if isinstance(node.left, ast.Num) and isinstance(node.right, ast.Num):
-                a = node.left.n
-                b = node.right.n
-                if type(a) != type(b) and ImplicitCasts not in self.features:
-                    self.action(node, ImplicitCasts)
-
-    def visit_Break(self, node):
-        pass
-
-    def visit_BoolOp(self, node):
-        operands = list(map(self.visit, node.values))
-        operator = node.op.__class__
-
-        ## Check for implicit coercions between numeric types
-        if ImplicitCasts not in self.features:
-            for operand in node.values:
-                if isinstance(operand, ast.Num):
-                    self.action(node, ImplicitCasts)
-
-    # PY3
-    def visit_Bytes(self, node):
-        pass
-
-    def visit_Call(self, node):
-        name = self.visit(node.func)
-        args = list(map(self.visit, node.args))
-        keywords = list(map(self.visit, node.keywords))
-
-        # Python 2.x - 3.4
-        if hasattr(node,"starargs") and node.starargs:
-            ## Check for variadic arguments
-            starargs = self.visit(node.starargs)
-
-            if VarArgs not in self.features:
-                self.action(node, VarArgs)
-
-        if (hasattr(node,'keywords') and node.keywords) or \
-            (hasattr(node,'kwargs') and node.kwargs):
-            ## Check for keyword arguments
-            kwargs = list(map(self.visit, node.keywords))
-
-            if KeywordArgs not in self.features:
-                self.action(node, KeywordArgs)
-
-        # Python 3.5+
-        # TODO
-
-
-    def visit_ClassDef(self, node):
-
-        if Classes not in self.features:
-            self.action(node, Classes)
-
-        if node.bases:
-            bases = list(map(self.visit, node.bases))
-
-            ## Check for single inheritance
-            if len(bases) >= 1 and Inheritance not in self.features:
-                self.action(node, Inheritance)
-
-            ## Check for multiple inheritance
-            if len(bases) > 1 and MInheritance not in self.features:
-                self.action(node, MInheritance)
-
-        if node.decorator_list:
-            decorators = list(map(self.visit, node.decorator_list))
-
-            ## Check for class decorators
-            if decorators and ClassDecorators not in self.features:
-                self.action(node, ClassDecorators)
-
-
-        self.scope.append(('class', node))
-        body = list(map(self.visit, node.body))
-        self.scope.pop()
-
-    def visit_Compare(self, node):
-        ## Check for chained comparisons
-        if len(node.comparators) > 1 and ChainComparison not in self.features:
-            self.action(node, ChainComparison)
-
-        operands = list(map(self.visit, [node.left] + node.comparators))
-        operators = [op.__class__ for op in node.ops]
-
-    def visit_Continue(self, node):
-        ## Check for continue
-        if Continue not in self.features:
-            self.action(node, Continue)
-
-    def visit_Delete(self, node):
-        target = list(map(self.visit, node.targets))
-        if DelVar not in self.features:
-            self.action(node, DelVar)
-
-    def visit_Dict(self, node):
-        keys = list(map(self.visit, node.keys))
-        values = list(map(self.visit, node.values))
-
-    def visit_DictComp(self, node):
-        key = self.visit(node.key)
-        value = self.visit(node.value)
-        gens = list(map(self.visit, node.generators))
-
-        ## Check for dictionary comprehensions
-        if DictComp not in self.features:
-            self.action(node, DictComp)
-
-    def visit_Ellipsis(self, node):
-        pass
-
-    def visit_ExtSlice(self, node):
-        list(map(self.visit, node.dims))
-
-    def visit_ExceptHandler(self, node):
-
-        if node.name:
-            name = node.name.id
-        #if node.type:
-            #type = node.type.id
-        body = list(map(self.visit, node.body))
-
-        if Exceptions not in self.features:
-            self.action(node, Exceptions)
-
-    def visit_Exec(self, node):
-        ## Check for dynamic exec
-        if Exec not in self.features:
-            self.action(node, Exec)
-
-        body = self.visit(node.body)
-        if node.globals:
-            globals = self.visit(node.globals)
-        if node.locals:
-            locals = self.visit(node.locals)
-
-    def visit_Expr(self, node):
-        value = self.visit(node.value)
-
-    def visit_For(self, node):
-        target = self.visit(node.target)
-        iter = self.visit(node.iter)
-        body = list(map(self.visit, node.body))
-        orelse = list(map(self.visit, node.orelse))
-
-        ## Check for custom iterators
-        if CustomIterators not in self.features:
-            if not isinstance(node.iter, ast.Call):
-                self.action(node, CustomIterators)
-            elif isinstance(node.iter.func, ast.Name):
-                if node.iter.func.id not in ['xrange', 'range']:
-                    self.action(node, CustomIterators)
-            else:
-                self.action(node, CustomIterators)
-
-        ## Check for tuple unpacking
-        if TupleUnpacking not in self.features:
-            if isinstance(node.target, ast.Tuple):
-                self.action(node.target, TupleUnpacking)
-
-    def visit_FunctionDef(self, node):
-        self.check_arguments(node)
-
-        if node.decorator_list:
-            decorators = list(map(self.visit, node.decorator_list))
-
-            ## Check for class decorators
-            if decorators and Decorators not in self.features:
-                self.action(node, Decorators)
+#------------------------------------------------------------------------
+# Feature Masks
+#------------------------------------------------------------------------
 
-        ## Check for closures
-        scope_ty, scope = self.scope[-1]
-
-        if scope_ty == 'function' and scope != GLOBAL:
-            if Closures not in self.features:
-                self.action(node, Closures)
-
-        self.scope.append(('function', node))
-
-        for defn in node.body:
-            self.visit(defn)
-        self.scope.pop()
-
-    def visit_Global(self, node):
-        ## Check for globals
-        if Globals not in self.features:
-            self.action(node, Globals)
-
-    def visit_GeneratorExp(self, node):
-        self.visit(node.elt)
-        list(map(self.visit, node.generators))
-
-        ## Check for dictionary comprehensions
-        if GeneratorExp not in self.features:
-            self.action(node, GeneratorExp)
-
-    def visit_If(self, node):
-        test = self.visit(node.test)
-        body = list(map(self.visit, node.body))
-        orelse = list(map(self.visit, node.orelse))
-
-    def visit_IfExp(self, node):
-        test = self.visit(node.test)
-        body = self.visit(node.body)
-        orelse = self.visit(node.orelse)
+def featuremask(features):
+    """ Pack a set of feature codes into an integer with bit ``f`` set
+    for each feature ``f``. """
+    mask = 0
+    for feature in features:
+        mask |= 1 << feature
+    return mask
 
-        if Ternary not in self.features:
-            self.action(node, Ternary)
-
-    def visit_Import(self, node):
-        matcher = self.libs
-
-        ## Check for unsupported libraries
-        def check_import(name):
-            if name.startswith('.') and RelativeImports not in self.features:
-                self.action(node, RelativeImports)
-
-            if not re.match(matcher, name):
-                self.nolib(node, name)
+#------------------------------------------------------------------------
+# Checks
+#------------------------------------------------------------------------
 
+# Node type name -> [(feature, check)]. A check with a feature of None
+# is a library check and is enabled whenever a library list is given.
+checks = defaultdict(list)
+
+def check(nodetype, feature):
+    def register(fn):
+        checks[nodetype].append((feature, fn))
+        return fn
+    return register
+
+@check('FunctionDef', VarArgs)
+@check('AsyncFunctionDef', VarArgs)
+@check('Lambda', VarArgs)
+def arguments_varargs(self, node):
+    ## Check for variadic arguments
+    if node.args.vararg:
+        self.action(node, VarArgs)
+
+@check('FunctionDef', KeywordArgs)
+@check('AsyncFunctionDef', KeywordArgs)
+@check('Lambda', KeywordArgs)
+def arguments_kwargs(self, node):
+    ## Check for keyword arguments
+    if node.args.kwarg:
+        self.action(node, KeywordArgs)
+    if node.args.defaults or any(node.args.kw_defaults):
+        self.action(node, KeywordArgs)
+
+@check('Assert', Assertions)
+def assert_assertions(self, node):
+    ## Check for assertions
+    self.action(node, Assertions)
+
+@check('Assign', TupleUnpacking)
+def assign_tuple_unpacking(self, node):
+    ## Check for tuple unpacking
+    if len(node.targets) > 1:
+        self.action(node, TupleUnpacking)
+
+    if any(isinstance(x, ast.Tuple) for x in node.targets):
+        self.action(node, TupleUnpacking)
+
+@check('Assign', Metaclasses)
+def assign_metaclasses(self, node):
+    ## Check for metaclasses
+    for target in node.targets:
+        if isinstance(target, ast.Name) and target.id == '__metaclass__':
+            self.action(node, Metaclasses)
+
+@check('AsyncFunctionDef', AsyncAwait)
+@check('AsyncFor', AsyncAwait)
+@check('AsyncWith', AsyncAwait)
+@check('Await', AsyncAwait)
+def async_await(self, node):
+    ## Check for coroutines
+    self.action(node, AsyncAwait)
+
+@check('comprehension', AsyncAwait)
+def comprehension_async(self, node):
+    ## Check for asynchronous comprehensions
+    if node.is_async:
+        self.action(node.target, AsyncAwait)
+
+def numeric(node):
+    # The type of a numeric literal, or None for anything else
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, complex):
+        return type(node.value)
+
+@check('BinOp', ImplicitCasts)
+def binop_implicit_casts(self, node):
+    ## Check for implicit coercions between numeric types
+    left, right = numeric(node.left), numeric(node.right)
+    if left and right and left != right:
+        self.action(node, ImplicitCasts)
+
+@check('BoolOp', ImplicitCasts)
+def boolop_implicit_casts(self, node):
+    ## Check for implicit coercions between numeric types
+    for operand in node.values:
+        if numeric(operand):
+            self.action(node, ImplicitCasts)
+
+@check('Call', VarArgs)
+def call_varargs(self, node):
+    ## Check for variadic arguments
+    if any(isinstance(arg, ast.Starred) for arg in node.args):
+        self.action(node, VarArgs)
+
+@check('Call', KeywordArgs)
+def call_kwargs(self, node):
+    ## Check for keyword arguments
+    if node.keywords:
+        self.action(node, KeywordArgs)
+
+@check('Call', Exec)
+def call_exec(self, node):
+    ## Check for dynamic exec
+    if isinstance(node.func, ast.Name) and node.func.id == 'exec':
+        self.action(node, Exec)
+
+@check('Call', Printing)
+def call_printing(self, node):
+    ## Check for printing
+    if isinstance(node.func, ast.Name) and node.func.id == 'print':
+        self.action(node, Printing)
+
+@check('ClassDef', Classes)
+def classdef_classes(self, node):
+    self.action(node, Classes)
+
+@check('ClassDef', Inheritance)
+def classdef_inheritance(self, node):
+    ## Check for single inheritance
+    if len(node.bases) >= 1:
+        self.action(node, Inheritance)
+
+@check('ClassDef', MInheritance)
+def classdef_minheritance(self, node):
+    ## Check for multiple inheritance
+    if len(node.bases) > 1:
+        self.action(node, MInheritance)
+
+@check('ClassDef', ClassDecorators)
+def classdef_decorators(self, node):
+    ## Check for class decorators
+    if node.decorator_list:
+        self.action(node, ClassDecorators)
+
+@check('ClassDef', Metaclasses)
+def classdef_metaclasses(self, node):
+    ## Check for metaclasses
+    if any(kw.arg == 'metaclass' for kw in node.keywords):
+        self.action(node, Metaclasses)
+
+@check('Compare', ChainComparison)
+def compare_chain(self, node):
+    ## Check for chained comparisons
+    if len(node.comparators) > 1:
+        self.action(node, ChainComparison)
+
+@check('Continue', Continue)
+def continue_continue(self, node):
+    ## Check for continue
+    self.action(node, Continue)
+
+@check('Delete', DelVar)
+def delete_delvar(self, node):
+    self.action(node, DelVar)
+
+@check('DictComp', DictComp)
+def dictcomp_dictcomp(self, node):
+    ## Check for dictionary comprehensions
+    self.action(node, DictComp)
+
+@check('ExceptHandler', Exceptions)
+@check('Raise', Exceptions)
+@check('Try', Exceptions)
+@check('TryStar', Exceptions)
+def exceptions(self, node):
+    ## Check for exceptions
+    self.action(node, Exceptions)
+
+@check('For', CustomIterators)
+@check('AsyncFor', CustomIterators)
+def for_custom_iterators(self, node):
+    ## Check for custom iterators
+    if not isinstance(node.iter, ast.Call):
+        self.action(node, CustomIterators)
+    elif isinstance(node.iter.func, ast.Name):
+        if node.iter.func.id not in ['xrange', 'range']:
+            self.action(node, CustomIterators)
+    else:
+        self.action(node, CustomIterators)
+
+@check('For', TupleUnpacking)
+@check('AsyncFor', TupleUnpacking)
+def for_tuple_unpacking(self, node):
+    ## Check for tuple unpacking
+    if isinstance(node.target, ast.Tuple):
+        self.action(node.target, TupleUnpacking)
+
+@check('FunctionDef', Decorators)
+@check('AsyncFunctionDef', Decorators)
+def functiondef_decorators(self, node):
+    ## Check for decorators
+    if node.decorator_list:
+        self.action(node, Decorators)
+
+@check('FunctionDef', Closures)
+@check('AsyncFunctionDef', Closures)
+def functiondef_closures(self, node):
+    ## Check for closures
+    scope_ty, scope = self.scope[-1]
+
+    if scope_ty == 'function' and scope != GLOBAL:
+        self.action(node, Closures)
+
+@check('Global', Globals)
+def global_globals(self, node):
+    ## Check for globals
+    self.action(node, Globals)
+
+@check('GeneratorExp', GeneratorExp)
+def generatorexp_generatorexp(self, node):
+    ## Check for generator expressions
+    self.action(node, GeneratorExp)
+
+@check('IfExp', Ternary)
+def ifexp_ternary(self, node):
+    self.action(node, Ternary)
+
+@check('Import', None)
+def import_libraries(self, node):
+    ## Check for unsupported libraries
+    for package in node.names:
+        if not self.libs(package.name):
+            self.nolib(node, package.name)
+
+@check('ImportFrom', ImportStar)
+def importfrom_star(self, node):
+    ## Check for "import *"
+    for package in node.names:
+        if package.name == '*':
+            self.action(node, ImportStar)
+
+@check('ImportFrom', RelativeImports)
+def importfrom_relative(self, node):
+    ## Check for relative imports
+    if node.level:
         for package in node.names:
-            if self.libs:
-                check_import(package.name)
-
-    def visit_ImportFrom(self, node):
-        matcher = self.libs
-
-        ## Check for unsupported libraries
-        def check_import(name):
-
-            if not re.match(matcher, name):
-                self.nolib(node, name)
+            self.action(node, RelativeImports)
 
+@check('ImportFrom', None)
+def importfrom_libraries(self, node):
+    ## Check for unsupported libraries
+    if node.module and not node.level:
         for package in node.names:
-            ## Check for "import *"
-            if package.name == '*' and ImportStar not in self.features:
-                self.action(node, ImportStar)
-
-            if node.module == None:
-                if RelativeImports not in self.features:
-                    self.action(node, RelativeImports)
-
-            if node.module and self.libs:
-                munged = node.module + '.' + package.name
-                check_import(munged)
-
-    def visit_Index(self, node):
-        self.visit(node.value)
-
-    def visit_Lambda(self, node):
-        ## Check for lambdas
-        if Lambda not in self.features:
-            self.action(node, Lambda)
+            munged = node.module + '.' + package.name
+            if not self.libs(munged):
+                self.nolib(node, munged)
+
+@check('JoinedStr', FStrings)
+def joinedstr_fstrings(self, node):
+    ## Check for f-strings
+    self.action(node, FStrings)
+
+@check('Lambda', Lambda)
+def lambda_lambda(self, node):
+    ## Check for lambdas
+    self.action(node, Lambda)
+
+def kind(node):
+    # Literals are told apart by the type of their value
+    if isinstance(node, ast.Constant):
+        return type(node.value)
+    return type(node)
+
+@check('List', HeteroList)
+def list_heterolist(self, node):
+    ## Check for hetereogenous lists
+    if node.elts:
+        ty = kind(node.elts[0])
+        for el in node.elts[1:]:
+            if kind(el) != ty:
+                self.action(node, HeteroList)
+
+@check('ListComp', ListComp)
+def listcomp_listcomp(self, node):
+    ## Check for list comprehensions
+    self.action(node, ListComp)
+
+@check('Match', PatternMatching)
+def match_pattern_matching(self, node):
+    ## Check for structural pattern matching
+    self.action(node, PatternMatching)
+
+@check('NamedExpr', NamedExpr)
+def namedexpr_namedexpr(self, node):
+    ## Check for assignment expressions
+    self.action(node, NamedExpr)
+
+@check('Return', MultipleReturn)
+def return_multiple(self, node):
+    ## Check for multiple returns
+    if isinstance(node.value, ast.Tuple):
+        self.action(node, MultipleReturn)
+
+@check('SetComp', SetComp)
+def setcomp_setcomp(self, node):
+    ## Check for set comprehensions
+    self.action(node, SetComp)
+
+def unindex(node):
+    # Before 3.9 plain subscripts are wrapped in an Index node
+    if type(node).__name__ == 'Index':
+        return node.value
+    return node
+
+def dims(node):
+    # The dimensions of an extended slice, whether it is a tuple or
+    # (before 3.9) an ExtSlice
+    s = unindex(node.slice)
+    if isinstance(s, ast.Tuple):
+        return s.elts
+    if type(s).__name__ == 'ExtSlice':
+        return [unindex(d) for d in s.dims]
+    return None
+
+def is_ellipsis(node):
+    return isinstance(node, ast.Constant) and node.value is Ellipsis
+
+@check('Subscript', FancyIndexing)
+def subscript_fancy_indexing(self, node):
+    ## Check for fancy indexing
+    d = dims(node)
+    if d and any(isinstance(a, ast.Slice) or is_ellipsis(a) for a in d):
+        self.action(node, FancyIndexing)
+
+@check('Subscript', Ellipsi)
+def subscript_ellipsis(self, node):
+    ## Check for ellipsis
+    d = dims(node)
+    if d and any(is_ellipsis(a) for a in d):
+        self.action(node, Ellipsi)
+
+    if is_ellipsis(unindex(node.slice)):
+        self.action(node, Ellipsi)
+
+@check('With', ContextManagers)
+@check('AsyncWith', ContextManagers)
+def with_context_managers(self, node):
+    ## Check for context managers
+    self.action(node, ContextManagers)
+
+@check('Yield', Generators)
+@check('YieldFrom', Generators)
+def yield_generators(self, node):
+    ## Check for generators
+    self.action(node, Generators)
 
-        self.check_arguments(node)
-
-        #args = self.visit(node.args)
-        body = self.visit(node.body)
-
-    def visit_List(self, node):
-        elts = list(map(self.visit, node.elts))
+#------------------------------------------------------------------------
+# Dispatch
+#------------------------------------------------------------------------
 
-        ## Check for hetereogenous lists
-        if node.elts and not HeteroList in self.features:
-            ty = type(node.elts[0])
-            for el in node.elts[1:]:
-                if type(el) != ty:
-                    self.action(node, HeteroList)
+# Node type name -> fields to descend into, in source order. Every node
+# type of the Python 3.8 to 3.13 grammars is listed so that each has its
+# own entry in the dispatch table.
+children = {
+    # Modules
+    'Module'           : ('body',),
+    'Interactive'      : ('body',),
+    'Expression'       : ('body',),
+    'FunctionType'     : ('argtypes', 'returns'),
+
+    # Statements
+    'FunctionDef'      : ('decorator_list', 'type_params', 'args', 'returns', 'body'),
+    'AsyncFunctionDef' : ('decorator_list', 'type_params', 'args', 'returns', 'body'),
+    'ClassDef'         : ('decorator_list', 'type_params', 'bases', 'keywords', 'body'),
+    'Return'           : ('value',),
+    'Delete'           : ('targets',),
+    'Assign'           : ('targets', 'value'),
+    'TypeAlias'        : ('name', 'type_params', 'value'),
+    'AugAssign'        : ('target', 'value'),
+    'AnnAssign'        : ('target', 'annotation', 'value'),
+    'For'              : ('target', 'iter', 'body', 'orelse'),
+    'AsyncFor'         : ('target', 'iter', 'body', 'orelse'),
+    'While'            : ('test', 'body', 'orelse'),
+    'If'               : ('test', 'body', 'orelse'),
+    'With'             : ('items', 'body'),
+    'AsyncWith'        : ('items', 'body'),
+    'Match'            : ('subject', 'cases'),
+    'Raise'            : ('exc', 'cause'),
+    'Try'              : ('body', 'handlers', 'orelse', 'finalbody'),
+    'TryStar'          : ('body', 'handlers', 'orelse', 'finalbody'),
+    'Assert'           : ('test', 'msg'),
+    'Import'           : (),
+    'ImportFrom'       : (),
+    'Global'           : (),
+    'Nonlocal'         : (),
+    'Expr'             : ('value',),
+    'Pass'             : (),
+    'Break'            : (),
+    'Continue'         : (),
+
+    # Expressions
+    'BoolOp'           : ('values',),
+    'NamedExpr'        : ('target', 'value'),
+    'BinOp'            : ('left', 'right'),
+    'UnaryOp'          : ('operand',),
+    'Lambda'           : ('args', 'body'),
+    'IfExp'            : ('test', 'body', 'orelse'),
+    'Dict'             : ('keys', 'values'),
+    'Set'              : ('elts',),
+    'ListComp'         : ('elt', 'generators'),
+    'SetComp'          : ('elt', 'generators'),
+    'DictComp'         : ('key', 'value', 'generators'),
+    'GeneratorExp'     : ('elt', 'generators'),
+    'Await'            : ('value',),
+    'Yield'            : ('value',),
+    'YieldFrom'        : ('value',),
+    'Compare'          : ('left', 'comparators'),
+    'Call'             : ('func', 'args', 'keywords'),
+    'FormattedValue'   : ('value', 'format_spec'),
+    'JoinedStr'        : ('values',),
+    'Constant'         : (),
+    'Attribute'        : ('value',),
+    'Subscript'        : ('value', 'slice'),
+    'Starred'          : ('value',),
+    'Name'             : (),
+    'List'             : ('elts',),
+    'Tuple'            : ('elts',),
+    'Slice'            : ('lower', 'upper', 'step'),
+    'Index'            : ('value',),
+    'ExtSlice'         : ('dims',),
+
+    # Pattern matching
+    'match_case'       : ('pattern', 'guard', 'body'),
+    'MatchValue'       : ('value',),
+    'MatchSingleton'   : (),
+    'MatchSequence'    : ('patterns',),
+    'MatchMapping'     : ('keys', 'patterns'),
+    'MatchClass'       : ('cls', 'patterns', 'kwd_patterns'),
+    'MatchStar'        : (),
+    'MatchAs'          : ('pattern',),
+    'MatchOr'          : ('patterns',),
+
+    # Type parameters
+    'TypeVar'          : ('bound', 'default_value'),
+    'ParamSpec'        : ('default_value',),
+    'TypeVarTuple'     : ('default_value',),
+
+    # Miscellaneous
+    'comprehension'    : ('target', 'iter', 'ifs'),
+    'ExceptHandler'    : ('type', 'body'),
+    'arguments'        : ('posonlyargs', 'args', 'vararg', 'kwonlyargs',
+                          'kwarg', 'defaults', 'kw_defaults'),
+    'arg'              : ('annotation',),
+    'keyword'          : ('value',),
+    'alias'            : (),
+    'withitem'         : ('context_expr', 'optional_vars'),
+    'TypeIgnore'       : (),
+}
+
+# Node type name -> scope pushed while visiting its children
+scopes = {
+    'ClassDef'         : 'class',
+    'FunctionDef'      : 'function',
+    'AsyncFunctionDef' : 'function',
+}
+
+_dispatch_cache = {}
+
+def compile_dispatch(mask, libs=False):
+    """ Build the table of node type -> (checks, fields, scope) for the
+    given feature mask. Only the checks for features outside the mask
+    are kept, so node types whose features are all enabled are only
+    descended into. """
+    key = (mask, libs)
+    if key in _dispatch_cache:
+        return _dispatch_cache[key]
+
+    dispatch = {}
+    for name, fields in children.items():
+        nodetype = getattr(ast, name, None)
+        if nodetype is None:
+            continue
+
+        enabled = tuple(fn for feature, fn in checks.get(name, ())
+                        if (libs if feature is None else not mask >> feature & 1))
+        # Fields are stored last first, in the order the walker pushes
+        # them onto its stack.
+        fields = tuple(f for f in reversed(fields) if f in nodetype._fields)
+        dispatch[nodetype] = (enabled, fields, scopes.get(name))
+
+    _dispatch_cache[key] = dispatch
+    return dispatch
 
-    def visit_ListComp(self, node):
-        elt = self.visit(node.elt)
-        gens = list(map(self.visit, node.generators))
+#------------------------------------------------------------------------
+# Custom Rules
+#------------------------------------------------------------------------
 
-        ## Check for list comprehensions
-        if ListComp not in self.features:
-            self.action(node, ListComp)
+# Custom feature code -> [(node type name, predicate)]
+custom = defaultdict(list)
+
+_builtin = frozenset(FeatureNames)
+
+def register_feature(name):
+    """ Allocate a feature code for a custom feature, after the built-in
+    ones, and return it. Registering a name again returns the same code.
+    Custom features are allowed in ``FullPython`` like any other. """
+    if not name.isidentifier():
+        raise ValueError('Feature name must be an identifier: %r' % name)
+    for code, known in FeatureNames.items():
+        if known == name:
+            return code
+
+    code = max(FeatureNames) + 1
+    FeatureNames[code] = name
+    FullPython.add(code)
+    return code
+
+def rule(nodetypes, feature):
+    """ Decorator registering ``predicate(node)`` as a check for a
+    feature on one or more node types, given as ``ast`` classes or
+    their names. The feature is reported at every node for which the
+    predicate is true, so node types without a position, such as
+    ``arguments`` or ``comprehension``, can't be given rules; check
+    them from the node they belong to.
+
+    Rules are compiled into the same per-node-type dispatch table as
+    the built-in checks, so any number of them are run in one walk, and
+    only when their feature is outside the allowed set. They apply to
+    visitors created after they're registered. """
+    if isinstance(nodetypes, (str, type)):
+        nodetypes = [nodetypes]
+    names = [t if isinstance(t, str) else t.__name__ for t in nodetypes]
+
+    for name in names:
+        if name not in children:
+            raise ValueError('Unknown node type %s' % name)
+        # Features are reported at the node's line, so rules on nodes
+        # without one belong on the node around them
+        nodetype = getattr(ast, name, None)
+        if nodetype is not None and 'lineno' not in nodetype._attributes:
+            raise ValueError('Node type %s has no position to report '
+                             'a feature at' % name)
+    if feature not in FeatureNames:
+        raise ValueError('Unknown feature %r, register it first' % feature)
+
+    def register(predicate):
+        def fn(self, node):
+            if predicate(node):
+                self.action(node, feature)
+        functools.update_wrapper(fn, predicate)
+
+        for name in names:
+            checks[name].append((feature, fn))
+            custom[feature].append((name, predicate))
+        _dispatch_cache.clear()
+        return predicate
+
+    return register
+
+def unregister_feature(feature):
+    """ Remove a custom feature and every rule registered for it. """
+    if feature in _builtin:
+        raise ValueError('Not a custom feature: %r' % feature)
+
+    for name, fns in checks.items():
+        fns[:] = [(f, fn) for f, fn in fns if f != feature]
+    custom.pop(feature, None)
+    FeatureNames.pop(feature, None)
+    FullPython.discard(feature)
+    _dispatch_cache.clear()
+
+def export_rules():
+    """ The custom features and their rules, for registering in worker
+    processes with ``import_rules``. Predicates are sent by reference,
+    so to run in processes that aren't forked they must be importable
+    module-level functions. """
+    return [(code, FeatureNames[code], list(custom.get(code, ())))
+            for code in sorted(FeatureNames) if code not in _builtin]
+
+def import_rules(exported):
+    """ Make the custom features and rules of this process those from
+    ``export_rules``, registering only what isn't already registered. """
+    codes = set(code for code, name, rules in exported)
+    for code in list(FeatureNames):
+        if code not in _builtin and code not in codes:
+            unregister_feature(code)
+
+    for code, name, rules in exported:
+        if FeatureNames.get(code) != name:
+            if code in FeatureNames:
+                unregister_feature(code)
+            FeatureNames[code] = name
+            FullPython.add(code)
+        for nodetype, predicate in rules:
+            if (nodetype, predicate) not in custom.get(code, ()):
+                rule(nodetype, code)(predicate)
+
+def worker_pool(workers, context=None):
+    """ Process pool whose workers have the custom rules registered in
+    this process when it is created. """
+    return ProcessPoolExecutor(workers, mp_context=context,
+                               initializer=import_rules,
+                               initargs=(export_rules(),))
+
+def rules_key():
+    """ The registered custom rules, for keying cached results. """
+    return tuple((FeatureNames[f], name, p.__module__, p.__qualname__)
+                 for f in sorted(custom) for name, p in custom[f])
 
-    def visit_Name(self, node):
-        pass
+#------------------------------------------------------------------------
+# Source Lines
+#------------------------------------------------------------------------
 
-    def visit_Num(self, node):
-        pass
+_newline = re.compile(r'\r\n?|\n')
+
+class LineIndex(object):
+    """ Offsets of the start of every line in a source string, so single
+    lines and node snippets can be fetched without splitting the whole
+    source. """
+
+    def __init__(self, source):
+        self.source = source
+        self.starts = [0]
+        self.starts.extend(m.end() for m in _newline.finditer(source))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def offset(self, lineno, col_offset=0):
+        """ Character offset of the given line and UTF-8 byte column, as
+        found on AST nodes. """
+        start = self.starts[lineno-1]
+        if col_offset:
+            line = self.line(lineno).encode('utf-8')
+            start += len(line[:col_offset].decode('utf-8', 'replace'))
+        return start
+
+    def line(self, lineno):
+        start = self.starts[lineno-1]
+        if lineno < len(self.starts):
+            end = self.starts[lineno]
+        else:
+            end = len(self.source)
+        return self.source[start:end].rstrip('\r\n')
 
-    def visit_Module(self, node):
-        body = list(map(self.visit, node.body))
+    def snippet(self, node):
+        """ Source text spanned by the given node. """
+        end_lineno = getattr(node, 'end_lineno', None)
+        if end_lineno is None:
+            return self.line(node.lineno)[node.col_offset:]
 
-    def visit_Pass(self, node):
-        pass
+        start = self.offset(node.lineno, node.col_offset)
+        end = self.offset(end_lineno, node.end_col_offset)
+        return self.source[start:end]
 
-    def visit_Print(self, node):
-        ## Check for printing
-        if Printing not in self.features:
-            self.action(node, Printing)
+#------------------------------------------------------------------------
+# Limits
+#------------------------------------------------------------------------
 
-        if node.dest:
-            dest = self.visit(node.dest)
+class Limits(object):
+    """ Bounds on the work done checking a source that isn't trusted.
+    Limits left as None aren't enforced. The ``timeout`` budget in
+    seconds covers both parsing and the walk, but is only checked
+    once the parse has finished, so ``max_bytes`` should be set too. """
+
+    def __init__(self, max_bytes=None, max_nodes=None, max_depth=None,
+                 timeout=None):
+        self.max_bytes = max_bytes
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.timeout = timeout
+
+    def check_source(self, source):
+        if self.max_bytes is None:
+            return
+        # Characters are never more than bytes, so only encode when
+        # the length alone doesn't settle it.
+        if len(source) > self.max_bytes or \
+           len(source.encode('utf-8', 'surrogatepass')) > self.max_bytes:
+            raise LimitExceeded('max_bytes')
+
+def parse(source):
+    """ Parse the source, raising ``LimitExceeded`` for input nested
+    too deeply or too large for the parser. """
+    try:
+        return ast.parse(source)
+    except RecursionError:
+        raise LimitExceeded('max_depth')
+    except MemoryError:
+        raise LimitExceeded('memory')
 
-        values = list(map(self.visit, node.values))
+#------------------------------------------------------------------------
+# AST Traversal
+#------------------------------------------------------------------------
 
-    def visit_Raise(self, node):
-        if node.type:
-            self.visit(node.type)
+GLOBAL = 0
 
-        ## Check for exceptions
-        if Exceptions not in self.features:
-            self.action(node, Exceptions)
+# Marks where a scope ends on the walker's stack
+_POP = object()
+
+def getsource(source):
+    if isinstance(source, types.ModuleType):
+        source = dedent(inspect.getsource(source))
+    if isinstance(source, types.FunctionType):
+        source = dedent(inspect.getsource(source))
+    if isinstance(source, types.LambdaType):
+        source = dedent(inspect.getsource(source))
+    elif isinstance(source, str):
+        source = source
+    else:
+        raise NotImplementedError
+    return source
 
-    def visit_Return(self, node):
-        if node.value:
-            self.visit(node.value)
+#------------------------------------------------------------------------
+# Source Cache
+#------------------------------------------------------------------------
 
-        ## Check for multiple returns
-        if isinstance(node.value, ast.Tuple) and MultipleReturn not in self.features:
-            self.action(node, MultipleReturn)
+class SourceCache(object):
+    """ Source, line index and parsed tree of the files that live
+    modules and functions are checked from, so checking many functions
+    from one file parses it once. A file is re-read when its
+    modification time or size changes. """
+
+    def __init__(self, max_files=64):
+        self.max_files = max_files
+        self.files = OrderedDict()
+
+    def file(self, filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        entry = self.files.get(filename)
+        if entry is not None and entry[0] == stamp:
+            self.files.move_to_end(filename)
+            return entry
+
+        with tokenize.open(filename) as fd:
+            source = fd.read()
+        tree = parse(source)
+
+        # Function definitions by their first line, which is the line
+        # of their first decorator if they have one.
+        defs = {}
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                defs[first] = None if first in defs else node
+
+        entry = self.files[filename] = (stamp, source, LineIndex(source), tree, defs)
+        if len(self.files) > self.max_files:
+            self.files.popitem(last=False)
+        return entry
+
+    def lookup(self, obj):
+        """ The source, line index, tree, line offset and column offset
+        to check a module or function with, or None if it has to be
+        found with inspect. """
+        if isinstance(obj, types.FunctionType):
+            obj = inspect.unwrap(obj)
+
+        try:
+            filename = inspect.getsourcefile(obj)
+        except TypeError:
+            return None
+        if not filename:
+            return None
+
+        entry = self.file(filename)
+        if entry is None:
+            return None
+        stamp, source, lines, tree, defs = entry
+
+        if isinstance(obj, types.ModuleType):
+            return source, lines, tree, 0, 0
+
+        # Lambdas share their first line with the statement around them
+        # and are left to inspect, as are functions that can't be told
+        # apart by their first line.
+        code = obj.__code__
+        node = defs.get(code.co_firstlineno)
+        if node is None or code.co_name != node.name:
+            return None
+
+        first = code.co_firstlineno
+        indent = len(lines.line(first)) - len(lines.line(first).lstrip())
+        return source, lines, node, first - 1, indent
+
+sources = SourceCache()
 
-    def visit_Set(self, node):
-        elts = list(map(self.visit, node.elts))
+class PythonVisitor(ast.NodeVisitor):
 
-    def visit_SetComp(self, node):
-        elt = self.visit(node.elt)
-        gens = list(map(self.visit, node.generators))
+    def __init__(self, features, libs, limits=None):
+        self.scope = deque([('global', 0)])
+        self.halted = False
+        self.lineoffset = 0
+        self.coloffset = 0
+        self.features = features
+        self.mask = featuremask(features)
+        self.limits = limits
 
-        ## Check for set comprehensions
-        if SetComp not in self.features:
-            self.action(node, SetComp)
+        if libs:
+            self.libs = compile_libraries(libs)
+        else:
+            self.libs = None
 
-    def visit_Slice(self, node):
-        lower = node.lower
-        if lower is not None:
-            lower = self.visit(lower)
+        self._dispatch = compile_dispatch(self.mask, bool(libs))
 
-        upper = node.upper
-        if upper is not None:
-            upper = self.visit(upper)
+    def __call__(self, source):
+        self.halted = False
+        self.lineoffset = 0
+        self.coloffset = 0
+        self.started = time.monotonic()
+        lines = None
+
+        found = None
+        if isinstance(source, (types.ModuleType, types.FunctionType)):
+            found = sources.lookup(source)
+
+        # A tree that was already parsed is walked as is, though without
+        # its source no line text can be reported.
+        if isinstance(source, ast.AST):
+            tree, source = source, None
+        elif found:
+            # Functions are walked in the tree of their whole file, with
+            # lines and columns reported relative to the function as if
+            # its source had been extracted and parsed on its own.
+            source, lines, tree, self.lineoffset, self.coloffset = found
+        else:
+            source = getsource(source)
+            if self.limits:
+                self.limits.check_source(source)
+            tree = self.parse(source)
 
-        step = node.step
-        if step is not None:
-            step = self.visit(step)
+        self.scope = deque([('global', 0)])
+        self._source = source
+        self._lines = lines
+        self._ast = tree
 
-    def visit_Str(self, node):
-        pass
+        if self.limits:
+            self.visit_limited(self._ast)
+        else:
+            self.visit(self._ast)
 
-    def visit_Starred(self, node):
-        self.visit(node.value)
+    parse = staticmethod(parse)
 
-    def visit_Subscript(self, node):
-        value = self.visit(node.value)
-        slice = self.visit(node.slice)
+    @property
+    def lines(self):
+        """ Line index over the source currently being checked, built
+        on first use. """
+        if self._source is None:
+            return None
+        if self._lines is None:
+            self._lines = LineIndex(self._source)
+        return self._lines
 
-        ## Check for fancy indexing
-        if isinstance(node.slice, ast.ExtSlice) and FancyIndexing not in self.features:
-            self.action(node, FancyIndexing)
+    def nolib(self, node, library):
+        raise self.error(LibraryNotSupported, node, library)
 
-            ## Check for ellipsis
-            if Ellipsi not in self.features:
-                if any(type(a) == ast.Ellipsis for a in node.slice.dims):
-                    self.action(node, Ellipsi)
+    def error(self, cls, node, what):
+        """ Build an exception of the given class for the node. """
+        line = self.lines and self.lines.line(node.lineno)[self.coloffset:]
+        lineno = node.lineno - self.lineoffset
+        offset = node.col_offset - self.coloffset
+        return cls(what, ('<stdin>', lineno, offset + 1, line))
 
-        if isinstance(node.slice, ast.Ellipsis) and Ellipsi not in self.features:
-            self.action(node, Ellipsi)
+    def action(self, node, feature):
+        raise NotImplementedError
 
-    def visit_TryExcept(self, node):
-        body = list(map(self.visit, node.body))
-        if node.handlers:
-            handlers = list(map(self.visit, node.handlers))
+    def halt(self):
+        """ Stop the walk once the checks on the current node finish.
+        Called by visitors that have reached their verdict; what a
+        halted walk returns covers only the nodes visited before it
+        stopped. """
+        self.halted = True
 
-        if node.orelse:
-            orelse = list(map(self.visit, node.orelse))
+    def check_many(self, sources):
+        """ Check each of an iterable of sources in turn, yielding the
+        results as they are produced. """
+        for source in sources:
+            yield self(source)
 
-        ## Check for exceptions
-        if Exceptions not in self.features:
-            self.action(node, Exceptions)
+    # -------------------------------------------------
 
-    def visit_TryFinally(self, node):
-        body = list(map(self.visit, node.body))
-        finalbody = list(map(self.visit, node.finalbody))
+    def visit(self, node):
+        # Walk with an explicit stack rather than recursing into each
+        # child, so deeply nested trees can't exhaust the C stack. The
+        # scope is popped when the _POP marker pushed beneath a scoped
+        # node's children comes back off the stack.
+        dispatch = self._dispatch
+        scope = self.scope
+        stack = [node]
+        push = stack.append
+        extend = stack.extend
+        pop = stack.pop
+
+        while stack and not self.halted:
+            node = pop()
+            if node is None:
+                continue
+            if node is _POP:
+                scope.pop()
+                continue
+
+            entry = dispatch.get(type(node))
+            if entry is None:
+                # Syntax newer than the children table has no checks
+                # and is descended into generically
+                extend(reversed(list(ast.iter_child_nodes(node))))
+                continue
+            enabled, fields, kind = entry
+
+            for fn in enabled:
+                fn(self, node)
+
+            if kind:
+                scope.append((kind, node))
+                push(_POP)
+
+            for name in fields:
+                child = getattr(node, name)
+                if type(child) is list:
+                    extend(reversed(child))
+                else:
+                    push(child)
+
+    def visit_limited(self, node):
+        # The same walk as visit, also tracking the depth of each node
+        # and the number of nodes seen. Kept apart so that unlimited
+        # checks don't pay for the bookkeeping. Each node on the stack
+        # is kept with its nearest ancestor that has a position, where
+        # a limit reached at a node without one is reported.
+        limits = self.limits
+        max_nodes = sys.maxsize if limits.max_nodes is None else limits.max_nodes
+        max_depth = sys.maxsize if limits.max_depth is None else limits.max_depth
+        deadline = None
+        if limits.timeout is not None:
+            deadline = self.started + limits.timeout
+
+        dispatch = self._dispatch
+        scope = self.scope
+        stack = [(node, 0, None)]
+        push = stack.append
+        extend = stack.extend
+        pop = stack.pop
+        count = 0
+
+        if deadline is not None and time.monotonic() > deadline:
+            raise LimitExceeded('timeout')
+
+        while stack and not self.halted:
+            node, depth, where = pop()
+            if node is None:
+                continue
+            if node is _POP:
+                scope.pop()
+                continue
+
+            if hasattr(node, 'lineno'):
+                where = node
+
+            count += 1
+            if count > max_nodes:
+                raise self.limit(where, 'max_nodes')
+            if depth > max_depth:
+                raise self.limit(where, 'max_depth')
+            if deadline is not None and not count & 1023 and \
+               time.monotonic() > deadline:
+                raise self.limit(where, 'timeout')
+
+            entry = dispatch.get(type(node))
+            if entry is None:
+                extend([(c, depth + 1, where) for c in
+                        reversed(list(ast.iter_child_nodes(node)))])
+                continue
+            enabled, fields, kind = entry
+
+            for fn in enabled:
+                fn(self, node)
+
+            if kind:
+                scope.append((kind, node))
+                push((_POP, depth, None))
+
+            depth += 1
+            for name in fields:
+                child = getattr(node, name)
+                if type(child) is list:
+                    extend([(c, depth, where) for c in reversed(child)])
+                else:
+                    push((child, depth, where))
+
+    def limit(self, node, name):
+        # Nodes outside any statement, like the module, have no position
+        if node is None:
+            return LimitExceeded(name)
+        return self.error(LimitExceeded, node, name)
 
-        ## Check for exceptions
-        if Exceptions not in self.features:
-            self.action(node, Exceptions)
+#------------------------------------------------------------------------
+# Validator
+#------------------------------------------------------------------------
 
-    def visit_Tuple(self, node):
-        return list(map(self.visit, node.elts))
+class FeatureNotSupported(SyntaxError): pass
 
-    def visit_UnaryOp(self, node):
-        operand = self.visit(node.operand)
-        op = node.op.__class__
+class LibraryNotSupported(FeatureNotSupported): pass
 
-    def visit_While(self, node):
-        test = self.visit(node.test)
-        body = list(map(self.visit, node.body))
-        if node.orelse:
-            orelse = list(map(self.visit, node.orelse))
+class LimitExceeded(FeatureNotSupported):
+    """ The source is too large or too deeply nested to be checked
+    within the configured ``Limits``. The message names the limit. """
 
-    def visit_With(self, node):
-        ## Check for context managers
-        if ContextManagers not in self.features:
-            self.action(node, ContextManagers)
+_errors = {
+    'FeatureNotSupported' : FeatureNotSupported,
+    'LibraryNotSupported' : LibraryNotSupported,
+}
 
-        exp = self.visit(node.context_expr)
-        if node.optional_vars:
-            var = node.optional_vars and self.visit(node.optional_vars)
-        body = list(map(self.visit, node.body))
+class FeaturesNotSupported(FeatureNotSupported):
+    """ Every violation found in a source, reported as the first one
+    with the rest in ``errors``. """
 
-    def visit_Yield(self, node):
-        ## Check for generators
-        if Generators not in self.features:
-            self.action(node, Generators)
+    def __init__(self, errors):
+        super(FeaturesNotSupported, self).__init__(*errors[0].args)
+        self.errors = errors
 
-        if node.value:
-            value = self.visit(node.value)
+class Validator(PythonVisitor):
+    """ Check if the given source conforms to the feature set or
+    raise an Exception. With ``collect`` every violation (up to
+    ``max_errors``) is gathered in one pass and returned instead. """
 
-    # PY3
-    def visit_YieldFrom(self, node):
-        if Generators not in self.features:
-            self.action(node, Generators)
+    def __init__(self, features, libraries, collect=False, max_errors=None,
+                 limits=None):
+        super(Validator, self).__init__(features, libraries, limits)
+        self.collect = collect
+        self.max_errors = max_errors if collect else 1
+        self.errors = None
 
-        if node.value:
-            value = self.visit(node.value)
+    def action(self, node, feature):
+        self.report(self.error(FeatureNotSupported, node, feature))
 
-    def generic_visit(self, node):
-        assert 0
+    def nolib(self, node, library):
+        self.report(self.error(LibraryNotSupported, node, library))
 
-#------------------------------------------------------------------------
-# Validator
-#------------------------------------------------------------------------
+    def report(self, error):
+        if self.halted:
+            return
 
-class FeatureNotSupported(SyntaxError): pass
+        self.errors.append(error)
+        if self.max_errors and len(self.errors) >= self.max_errors:
+            self.halt()
 
-class Validator(PythonVisitor):
-    """ Check if the given source conforms to the feature set or
-    raise an Exception. """
+    def __call__(self, source):
+        self.errors = []
+        super(Validator, self).__call__(source)
 
-    def action(self, node, feature):
-        line = self._source.splitlines()[node.lineno-1]
-        lineno = node.lineno
-        offset = node.col_offset
-        raise FeatureNotSupported(feature, ('<stdin>', lineno, offset + 1, line))
+        if self.collect:
+            return self.errors
+        if self.errors:
+            raise self.errors[0]
 
 class Checker(PythonVisitor):
     """ Aggregate sites for features that don't conform to the
-    given feature set """
+    given feature set. With ``collect`` imports of libraries outside
+    the list are gathered under the key None as ``(library, line)``
+    pairs rather than raised. """
 
-    def __init__(self, features, libraries):
-        super(Checker, self).__init__(features, libraries)
+    def __init__(self, features, libraries, limits=None, collect=False):
+        super(Checker, self).__init__(features, libraries, limits)
+        self.collect = collect
         self.detected = None
 
     def action(self, node, feature):
-        self.detected[feature].append(node.lineno)
+        self.detected[feature].append(node.lineno - self.lineoffset)
+
+    def nolib(self, node, library):
+        if not self.collect:
+            return super(Checker, self).nolib(node, library)
+        self.detected[None].append((library, node.lineno - self.lineoffset))
 
     def __call__(self, source):
         self.detected = defaultdict(list)
@@ -619,28 +1195,285 @@ class Checker(PythonVisitor):
 class Detect(PythonVisitor):
     """ Aggregate sites for conform to the given feature set """
 
-    def __init__(self):
-        super(Detect, self).__init__(set(), [])
+    def __init__(self, limits=None):
+        super(Detect, self).__init__(set(), [], limits)
         self.detected = None
 
     def action(self, node, feature):
-        self.detected[feature].append(node.lineno)
+        self.detected[feature].append(node.lineno - self.lineoffset)
 
     def __call__(self, source):
         self.detected = defaultdict(list)
         super(Detect, self).__call__(source)
         return dict(self.detected)
 
-def detect(source):
-    d = Detect()
+def detect(source, cache=None, limits=None):
+    d = Detect(limits)
+    if cache is None:
+        return d(source)
+
+    source = getsource(source)
+    key = cache.key('detect', source, (), ())
+    result = cache.get(key)
+    if result is None:
+        result = d(source)
+        cache.put(key, result)
+    return result
+
+def checker(source, features=None, libraries=None, cache=None, limits=None):
+    features = features or set()
+    libraries = libraries or list()
+
+    d = Checker(features, libraries, limits)
+    if cache is None:
+        return d(source)
+
+    source = getsource(source)
+    key = cache.key('checker', source, features, libraries)
+    result = cache.get(key)
+    if result is None:
+        result = d(source)
+        cache.put(key, result)
+    return result
+
+def validator(source, features=None, libraries=None, cache=None,
+              collect=False, max_errors=None, limits=None):
+    features = features or set()
+    libraries = libraries or list()
+
+    d = Validator(features, libraries, collect=True,
+                  max_errors=max_errors if collect else 1, limits=limits)
+
+    if cache is None:
+        errors = d(source)
+    else:
+        # The verdict is cached as the class name and arguments of each
+        # violation, so conforming source is cached as an empty tuple.
+        source = getsource(source)
+        kind = 'validator:%s' % d.max_errors
+        key = cache.key(kind, source, features, libraries)
+        verdict = cache.get(key)
+        if verdict is None:
+            verdict = tuple((type(e).__name__, e.args) for e in d(source))
+            cache.put(key, verdict)
+        errors = [_errors[name](*args) for name, args in verdict]
+
+    if errors and collect:
+        raise FeaturesNotSupported(errors)
+    if errors:
+        raise errors[0]
+
+def violations(source, features=None, libraries=None, max_errors=None):
+    """ List every violation of the feature set in one pass. """
+    d = Validator(features or set(), libraries or list(), collect=True,
+                  max_errors=max_errors)
     return d(source)
 
-def checker(source, features=None, libraries=None):
-    d = Checker(features or set(), libraries or list())
+class Profiles(PythonVisitor):
+    """ Aggregate sites for several feature sets at once. The walk runs
+    every check disallowed by any of the sets and each site is then
+    sorted into the results of the sets it violates. """
+
+    def __init__(self, profiles, libraries):
+        profiles = dict(profiles)
+        common = set.intersection(*map(set, profiles.values())) if profiles else set()
+        super(Profiles, self).__init__(common, libraries)
+
+        self.masks = dict((name, featuremask(features))
+                          for name, features in profiles.items())
+        self.sites = None
+
+    def action(self, node, feature):
+        self.sites.append((feature, node.lineno - self.lineoffset))
+
+    def __call__(self, source):
+        self.sites = []
+        super(Profiles, self).__call__(source)
+
+        results = {}
+        for name, mask in self.masks.items():
+            detected = defaultdict(list)
+            for feature, lineno in self.sites:
+                if not mask >> feature & 1:
+                    detected[feature].append(lineno)
+            results[name] = dict(detected)
+        return results
+
+def check_profiles(source, profiles, libraries=None):
+    """ Check one source against a mapping of profile names to feature
+    sets with a single parse and walk, returning the checker results
+    for each profile by name. """
+    d = Profiles(profiles, libraries or list())
     return d(source)
 
-def validator(source, features=None, libraries=None):
-    d = Validator(features or set(), libraries or list())
+def check_many(sources, features=None, libraries=None):
+    """ Run one checker over an iterable of sources, yielding a result
+    for each as soon as it is checked. """
+    d = Checker(features or set(), libraries or list())
+    return d.check_many(sources)
+
+#------------------------------------------------------------------------
+# Conformance
+#------------------------------------------------------------------------
+
+# Feature -> substrings of which at least one must appear in any source
+# using the feature. Features not listed are never filtered out.
+tokens = {
+    Generators      : ('yield',),
+    DelVar          : ('del',),
+    Closures        : ('def',),
+    Classes         : ('class',),
+    Decorators      : ('@',),
+    Inheritance     : ('class',),
+    MInheritance    : ('class',),
+    ClassDecorators : ('class',),
+    Assertions      : ('assert',),
+    Exceptions      : ('try', 'raise', 'except'),
+    Lambda          : ('lambda',),
+    RelativeImports : ('import',),
+    ImportStar      : ('import',),
+    Continue        : ('continue',),
+    MultipleReturn  : ('return',),
+    DictComp        : ('for',),
+    Exec            : ('exec',),
+    Globals         : ('global',),
+    ContextManagers : ('with',),
+    GeneratorExp    : ('for',),
+    Ternary         : ('else',),
+    ListComp        : ('for',),
+    SetComp         : ('for',),
+    CustomIterators : ('for',),
+    Printing        : ('print',),
+    Metaclasses     : ('metaclass',),
+    AsyncAwait      : ('async', 'await'),
+    FStrings        : ('f"', "f'", 'F"', "F'", 'fr', 'fR', 'Fr', 'FR'),
+    NamedExpr       : (':=',),
+    PatternMatching : ('match',),
+}
+
+class Conforms(PythonVisitor):
+    """ Check whether the source conforms to the feature set, stopping
+    at the first violation or unsupported library. """
+
+    def action(self, node, feature):
+        self.halt()
+
+    def nolib(self, node, library):
+        self.halt()
+
+    def __call__(self, source):
+        super(Conforms, self).__call__(source)
+        return not self.halted
+
+def conforms(source, features=None, libraries=None):
+    """ Whether the source uses only the given features and libraries.
+    Features whose keywords never appear in the source are ruled out
+    before parsing, and if none are left the source is only parsed, to
+    confirm it is valid, and not walked. """
+    features = set(features or ())
+    libraries = libraries or list()
+    source = getsource(source)
+
+    for feature, words in tokens.items():
+        if feature not in features and not any(w in source for w in words):
+            features.add(feature)
+
+    if libraries and 'import' not in source:
+        libraries = list()
+
+    if not libraries and not (FullPython - features):
+        # Source that doesn't parse never conforms, whatever words it
+        # has in it
+        parse(source)
+        return True
+
+    d = Conforms(features, libraries)
     return d(source)
 
 fd = detect
+
+#------------------------------------------------------------------------
+# Parallel Scanning
+#------------------------------------------------------------------------
+
+def _iter_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for top, dirs, files in os.walk(path):
+                dirs.sort()
+                for nm in sorted(files):
+                    if nm.endswith('.py'):
+                        yield os.path.join(top, nm)
+        else:
+            yield path
+
+def _read(path):
+    with tokenize.open(path) as fd:
+        return fd.read()
+
+def _scan_batch(paths, features, libraries, errors, collect):
+    d = Checker(features, libraries, collect=collect)
+    if errors == 'raise':
+        return list(d.check_many(_read(path) for path in paths))
+
+    results = []
+    for path in paths:
+        try:
+            results.append(d(_read(path)))
+        except (SyntaxError, ValueError, OSError) as e:
+            results.append(e)
+    return results
+
+def _batches(paths, size):
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def scan_paths(paths, features=None, libraries=None, workers=None,
+               chunksize=16, errors='raise', collect=False):
+    """ Run the checker over every file (or every ``.py`` file under
+    every directory) in ``paths`` across a pool of processes, yielding
+    ``(path, result)`` pairs in input order as they complete. With
+    ``errors='return'`` a file that can't be read or checked yields the
+    exception as its result instead of aborting the scan, and with
+    ``collect`` libraries outside the list are returned with the
+    features as by ``Checker``. """
+    features = features or set()
+    libraries = libraries or list()
+    workers = workers or os.cpu_count() or 1
+    args = (features, libraries, errors, collect)
+
+    batches = _batches(_iter_paths(paths), chunksize)
+
+    if workers == 1:
+        for batch in batches:
+            for path, result in zip(batch, _scan_batch(batch, *args)):
+                yield path, result
+        return
+
+    # Keep a bounded window of batches in flight so memory stays flat
+    # regardless of how many files are being scanned.
+    pool = worker_pool(workers)
+    pending = deque()
+    try:
+        for batch in batches:
+            pending.append((batch, pool.submit(_scan_batch, batch, *args)))
+            if len(pending) >= 2*workers:
+                batch, future = pending.popleft()
+                for path, result in zip(batch, future.result()):
+                    yield path, result
+        while pending:
+            batch, future = pending.popleft()
+            for path, result in zip(batch, future.result()):
+                yield path, result
+    finally:
+        # Batches not yet started when the scan is abandoned are
+        # dropped rather than run
+        for batch, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)